@@ -1,42 +1,182 @@
-import json
-import os
-from datetime import datetime
+from datetime import date, datetime
 import tkinter as tk
 from tkinter import messagebox, simpledialog
-from tkinter import scrolledtext
-from tkcalendar import Calendar
-import winsound  # For Windows sound notification
-
-DATA_FILE = "mood_diary.json"
-
-# Mood options and their color coding
-MOOD_OPTIONS = {
-    "Angry": "red",
-    "Sad": "blue",
-    "Exhausted": "gray",
-    "Happy": "yellow",
-    "Overwhelmed": "orange",
-    "Content": "green"
-}
+from mood_config import DATA_FILE, MOOD_OPTIONS, STORAGE_BACKEND
+from mood_storage import open_storage
+from mood_index import DateIndex
+from mood_search import SearchIndex, search_index_path
+from mood_analytics import MoodAnalytics
+from audio_service import get_audio_service
+import ui_monitor
 
 # Change this path to your own sound file
 NOTIFICATION_SOUND = "your_notification_sound.wav"  # Add a sound file in your directory
 
 def load_entries():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r") as file:
-            return json.load(file)
-    return []
+    # Plain dicts the caller may edit and hand back to save_entries
+    storage = open_storage(DATA_FILE, STORAGE_BACKEND, moods=MOOD_OPTIONS)
+    try:
+        return list(storage.iter_entries())
+    finally:
+        storage.close()
 
 def save_entries(entries):
-    with open(DATA_FILE, "w") as file:
-        json.dump(entries, file, indent=4)
+    storage = open_storage(DATA_FILE, STORAGE_BACKEND, moods=MOOD_OPTIONS)
+    try:
+        storage.load()
+        storage.replace_all(entries)
+    finally:
+        storage.close()
+
+def format_entry(entry):
+    return f"{entry['date']} - Mood: {entry['mood']}, Notes: {entry['notes']}\n"
+
+class EntryListView:
+    """Text widget that only renders the entries around the visible rows.
+
+    The scrollbar is driven by the position in the full entry list, while
+    the Text holds just a window of rows plus a buffer on each side. The
+    window slides as the user scrolls, so rendering cost does not depend on
+    the size of the diary.
+    """
+
+    def __init__(self, parent, entries, rows=10, buffer=30, **text_options):
+        self.entries = entries
+        self.indexes = None  # Entry indexes to list, or None for every entry
+        self.rows_by_index = None
+        self.empty_message = ""
+        self.rows = rows
+        self.buffer = buffer
+        self.active = False  # Nothing is rendered until the first show()
+        self.first = 0  # Position of the top visible row
+        self.start = self.end = 0  # Rendered window [start, end)
+        self._recenter_pending = False
+
+        self.frame = tk.Frame(parent)
+        self.scrollbar = tk.Scrollbar(self.frame, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text = tk.Text(self.frame, height=rows, yscrollcommand=self._on_text_scroll, **text_options)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        for mood, color in MOOD_OPTIONS.items():
+            self.text.tag_config(mood, foreground=color)
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    def total(self):
+        return len(self.entries) if self.indexes is None else len(self.indexes)
+
+    def entry_at(self, row):
+        return self.entries[row if self.indexes is None else self.indexes[row]]
+
+    def show(self, indexes=None, empty_message="No entries found. Start logging your mood!"):
+        """Show every entry, or only the given entry indexes in that order."""
+        self.active = True
+        self.indexes = indexes
+        self.rows_by_index = None if indexes is None else {index: row for row, index in enumerate(indexes)}
+        self.empty_message = empty_message
+        self.first = 0
+        self._render()
+
+    def scroll_to(self, first):
+        self.first = max(0, min(first, self.total() - self.rows))
+        if self.start <= self.first and self.first + self.rows <= self.end or self.end == self.start:
+            self.text.yview(f"{self.first - self.start + 1}.0")
+        else:
+            self._render()
+        self._update_scrollbar()
+
+    def entry_added(self, index):
+        if not self.active or self.indexes is not None:
+            return
+        if index <= self.end or self.end - self.start < self.rows + self.buffer:
+            self._render()
+        else:
+            self._update_scrollbar()
+
+    def entry_changed(self, index):
+        row = index if self.rows_by_index is None else self.rows_by_index.get(index, -1)
+        if not self.active or not self.start <= row < self.end:
+            return
+        # Replace just the affected line
+        line = row - self.start + 1
+        entry = self.entries[index]
+        self.text.delete(f"{line}.0", f"{line}.end")
+        self.text.insert(f"{line}.0", format_entry(entry).rstrip("\n"), entry['mood'])
+
+    def _render(self):
+        total = self.total()
+        self.text.delete(1.0, tk.END)  # Clear existing text
+        if not total:
+            self.start = self.end = 0
+            self.text.insert(tk.END, self.empty_message)
+            self._update_scrollbar()
+            return
+        self.first = max(0, min(self.first, total - 1))
+        self.start = max(0, self.first - self.buffer)
+        self.end = min(total, self.first + self.rows + self.buffer)
+        top_line = self.first - self.start + 1
+
+        # Build the text and per-mood tag ranges in one pass, then insert once
+        lines = []
+        ranges = {}
+        for line, row in enumerate(range(self.start, self.end), start=1):
+            entry = self.entry_at(row)
+            lines.append(format_entry(entry))
+            ranges.setdefault(entry['mood'], []).extend((f"{line}.0", f"{line}.end"))
+        if self.end == total:
+            lines.append("-----------------------\n")
+        self.text.insert(tk.END, "".join(lines))
+        for mood, indexes in ranges.items():
+            self.text.tag_add(mood, *indexes)
+        self.text.yview(f"{top_line}.0")
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = self.total()
+        if not total:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        self.scrollbar.set(self.first / total, min(1.0, (self.first + self.rows) / total))
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == tk.MOVETO:
+            self.scroll_to(int(float(amount) * self.total()))
+        elif action == tk.SCROLL:
+            step = self.rows if unit == tk.PAGES else 1
+            self.scroll_to(self.first + int(amount) * step)
+
+    def _on_text_scroll(self, first_fraction, last_fraction):
+        # Called when the Text scrolls itself (mouse wheel, keyboard)
+        if self.end == self.start:
+            return
+        top_line = int(self.text.index("@0,0").split(".")[0])
+        self.first = self.start + top_line - 1
+        self._update_scrollbar()
+        near_top = self.first - self.start < self.buffer // 2 and self.start > 0
+        near_bottom = self.end - self.first - self.rows < self.buffer // 2 and self.end < self.total()
+        if (near_top or near_bottom) and not self._recenter_pending:
+            self._recenter_pending = True
+            self.text.after_idle(self._recenter)
+
+    def _recenter(self):
+        self._recenter_pending = False
+        self._render()
 
 class MoodDiaryApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Mood Diary")
-        self.entries = load_entries()
+        self.storage = open_storage(DATA_FILE, STORAGE_BACKEND, moods=MOOD_OPTIONS)
+        self.storage.on_change = self.storage_changed  # Entries other windows or scripts wrote
+        self.entries = self.storage.load()
+        self.date_index = DateIndex(self.entries)  # Sorted date -> entry lookup
+        # Full-text index over notes, built or loaded on the first search
+        self.search_index = SearchIndex(self.entries, search_index_path(DATA_FILE), self.storage.version())
+        self.analytics = MoodAnalytics(self.entries)  # Running weekly/monthly mood counts and streaks
+        self.calendar_views = []  # day_changed(day) of each open calendar; day None means all
+        self.audio = get_audio_service()
+        self.audio.preload(NOTIFICATION_SOUND)
         
         self.setup_ui()
 
@@ -47,8 +187,8 @@ class MoodDiaryApp:
         self.entry_frame = tk.Frame(self.root, bg="#f0f8ff")
         self.entry_frame.pack(pady=10)
 
-        self.display_text = scrolledtext.ScrolledText(self.entry_frame, width=50, height=10, wrap=tk.WORD, bg="#ffffff", fg="#000000", font=("Arial", 12))
-        self.display_text.pack(padx=10)
+        self.entry_view = EntryListView(self.entry_frame, self.entries, rows=10, width=50, wrap=tk.WORD, bg="#ffffff", fg="#000000", font=("Arial", 12))
+        self.entry_view.pack(padx=10)
 
         self.view_button = tk.Button(self.root, text="View Entries", command=self.display_entries, bg="#add8e6", font=("Arial", 12))
         self.view_button.pack(pady=5)
@@ -56,6 +196,9 @@ class MoodDiaryApp:
         self.add_button = tk.Button(self.root, text="Add Entry", command=self.add_entry, bg="#add8e6", font=("Arial", 12))
         self.add_button.pack(pady=5)
 
+        self.search_button = tk.Button(self.root, text="Search Notes", command=self.search_entries, bg="#add8e6", font=("Arial", 12))
+        self.search_button.pack(pady=5)
+
         self.calendar_button = tk.Button(self.root, text="Show Calendar", command=self.show_calendar, bg="#add8e6", font=("Arial", 12))
         self.calendar_button.pack(pady=5)
 
@@ -63,80 +206,200 @@ class MoodDiaryApp:
         self.exit_button.pack(pady=5)
 
     def display_entries(self):
-        self.display_text.delete(1.0, tk.END)  # Clear existing text
-        if not self.entries:
-            self.display_text.insert(tk.END, "No entries found. Start logging your mood!")
+        self.entry_view.show()
+
+    def search_entries(self):
+        query = simpledialog.askstring("Search Notes", "Search for words in your notes (end a word with * to match prefixes):")
+        if not query:
             return
-        for entry in self.entries:
-            self.display_text.insert(tk.END, f"{entry['date']} - Mood: {entry['mood']}, Notes: {entry['notes']}\n")
-            # Color coding based on mood
-            self.display_text.tag_add(entry['mood'], "1.0", tk.END)
-            self.display_text.tag_config(entry['mood'], foreground=MOOD_OPTIONS[entry['mood']])
-        self.display_text.insert(tk.END, "-----------------------\n")
+        matches = self.search_index.search(query)
+        self.entry_view.show(matches, empty_message=f"No entries match '{query}'.")
+
+    def close(self):
+        self.storage.close()  # Let a running compaction finish
+        self.search_index.save(self.storage.version())
 
     def add_entry(self):
         # Limit to one entry per day
         today = datetime.now().strftime("%Y-%m-%d")
-        if any(entry['date'] == today for entry in self.entries):
+        self.storage.refresh()  # Another window may have logged today already
+        if today in self.date_index:
             messagebox.showwarning("Warning", "You have already logged your mood for today.")
             return
         
         mood = simpledialog.askstring("Mood Entry", "How are you feeling today? (Angry, Sad, Exhausted, Happy, Overwhelmed, Content)")
         notes = simpledialog.askstring("Mood Entry", "Any notes or thoughts?")
         if mood in MOOD_OPTIONS and notes:
-            self.entries.append({
+            entry = {
                 "date": today,
                 "mood": mood,
                 "notes": notes
-            })
-            save_entries(self.entries)
+            }
+            index = self.storage.add(entry)
+            self.entry_added(index, entry)
             self.play_sound(NOTIFICATION_SOUND)  # Play the notification sound
             messagebox.showinfo("Success", "Mood entry added!")
         else:
             messagebox.showwarning("Warning", "Invalid mood or notes cannot be empty.")
 
+    def entry_added(self, index, entry):
+        # Keep the indexes and the list view in step with the stored entries
+        self.date_index.add(index, entry)
+        self.search_index.add(index, entry)
+        self.analytics.add(entry)
+        self.entry_view.entry_added(index)
+        self.calendars_changed(entry['date'])
+
+    def entry_changed(self, index, old_entry, new_entry):
+        self.date_index.update(index, old_entry, new_entry)
+        self.search_index.update(index, old_entry, new_entry)
+        self.analytics.update(old_entry, new_entry, is_last_for_day=self.date_index.latest(new_entry['date']) == index)
+        self.entry_view.entry_changed(index)
+        self.calendars_changed(new_entry['date'])
+        if old_entry['date'] != new_entry['date']:
+            self.calendars_changed(old_entry['date'])
+
+    def calendars_changed(self, day):
+        for day_changed in list(self.calendar_views):
+            day_changed(day)
+
+    def storage_changed(self, index, old_entry):
+        # Called by the storage for entries another process added or edited
+        if index is None:
+            # Entries were removed, so start the indexes over
+            self.date_index = DateIndex(self.entries)
+            self.search_index = SearchIndex(self.entries, search_index_path(DATA_FILE), self.storage.version())
+            self.analytics = MoodAnalytics(self.entries)
+            if self.entry_view.active:
+                self.entry_view.show()
+            self.calendars_changed(None)
+        elif old_entry is None:
+            self.entry_added(index, self.entries[index])
+        else:
+            self.entry_changed(index, old_entry, self.entries[index])
+
     def play_sound(self, sound_file):
-        # Play the notification sound
-        if os.path.exists(sound_file):
-            winsound.PlaySound(sound_file, winsound.SND_FILENAME)
+        # Play the notification sound in the background (no-op if it is missing)
+        self.audio.play(sound_file)
 
     def show_calendar(self):
+        try:
+            from tkcalendar import Calendar  # Only needed once the calendar is opened
+        except ImportError:
+            self.show_date_prompt()
+            return
+
         # Open a new window with the calendar
         calendar_window = tk.Toplevel(self.root)
         calendar_window.title("Mood Calendar")
         cal = Calendar(calendar_window, selectmode='day', year=datetime.now().year, month=datetime.now().month, day=datetime.now().day)
         cal.pack(pady=20)
+        for mood, color in MOOD_OPTIONS.items():
+            cal.tag_config(mood, background=color, foreground="black")
+
+        summary_label = tk.Label(calendar_window, text="", justify=tk.LEFT)
+        summary_label.pack(pady=5)
+        colored_months = set()
+        day_events = {}  # "YYYY-MM-DD" -> calevent id of that day's mood
+
+        def color_day(day):
+            if day in day_events:
+                cal.calevent_remove(day_events.pop(day))
+            mood = self.analytics.day_mood(day)
+            if mood is not None:
+                day_events[day] = cal.calevent_create(date.fromisoformat(day), mood, tags=[mood])
+
+        # Color the displayed month's days from the precomputed per-day moods
+        def color_month(event=None):
+            month, year = cal.get_displayed_month()
+            if (year, month) not in colored_months:
+                colored_months.add((year, month))
+                for day in self.date_index.dates_between(f"{year:04d}-{month:02d}-01", f"{year:04d}-{month:02d}-31"):
+                    color_day(day)
+            dominant = self.analytics.dominant_mood(self.analytics.month_counts(year, month)) or "none yet"
+            summary_label.config(text=f"Most common mood this month: {dominant}\n"
+                                      f"Current streak: {self.analytics.current_streak()} days "
+                                      f"(longest: {self.analytics.longest_streak})")
+
+        # Follow entries added or edited while the calendar is open
+        def day_changed(day):
+            if day is None:
+                cal.calevent_remove('all')
+                day_events.clear()
+                colored_months.clear()
+            elif (int(day[:4]), int(day[5:7])) in colored_months:
+                color_day(day)
+            color_month()
+
+        def closed(event):
+            if event.widget is calendar_window and day_changed in self.calendar_views:
+                self.calendar_views.remove(day_changed)
+
+        self.calendar_views.append(day_changed)
+        calendar_window.bind("<Destroy>", closed)
+        cal.bind("<<CalendarMonthChanged>>", color_month)
+        color_month()
 
         # Display mood for the selected date
         def show_mood():
             selected_date = cal.get_date()
             selected_date_str = datetime.strptime(selected_date, '%m/%d/%y').strftime("%Y-%m-%d")
-            mood_entries = [entry for entry in self.entries if entry['date'] == selected_date_str]
-            if mood_entries:
-                mood_summary = f"Mood on {selected_date}:\n"
-                mood_colors = ', '.join(entry['mood'] for entry in mood_entries)
-                mood_summary += f"Moods logged: {mood_colors}\n"
-                # Get the mood color of the last entry
-                last_entry = mood_entries[-1]
-                mood_color = MOOD_OPTIONS[last_entry['mood']]
-                messagebox.showinfo("Mood Entry", mood_summary, icon='info')
-                # Set the window color based on the mood
-                calendar_window.configure(bg=mood_color)
-
-                # Edit mood entry option
-                if messagebox.askyesno("Edit Mood Entry", "Do you want to edit the notes for this date?"):
-                    new_notes = simpledialog.askstring("Edit Notes", "Enter new notes:")
-                    if new_notes:
-                        last_entry['notes'] = new_notes  # Update the last entry's notes
-                        save_entries(self.entries)
-                        messagebox.showinfo("Success", "Mood entry updated!")
-            else:
-                messagebox.showinfo("Mood Entry", "No mood logged for this date.")
+            self.show_day(selected_date_str, selected_date, calendar_window)
 
         show_button = tk.Button(calendar_window, text="Show Mood", command=show_mood)
         show_button.pack(pady=5)
 
+    def show_date_prompt(self):
+        # Fallback when tkcalendar is not installed: type the date instead
+        date_window = tk.Toplevel(self.root)
+        date_window.title("Mood Calendar")
+        tk.Label(date_window, text="Install tkcalendar for the calendar view.\nEnter a date (YYYY-MM-DD):").pack(padx=20, pady=10)
+        date_entry = tk.Entry(date_window)
+        date_entry.insert(0, date.today().isoformat())
+        date_entry.pack(padx=20)
+
+        def show_mood():
+            selected_date = date_entry.get().strip()
+            try:
+                date.fromisoformat(selected_date)
+            except ValueError:
+                messagebox.showwarning("Warning", "Please enter the date as YYYY-MM-DD.")
+                return
+            self.show_day(selected_date, selected_date, date_window)
+
+        tk.Button(date_window, text="Show Mood", command=show_mood).pack(pady=5)
+
+    def show_day(self, selected_date_str, selected_date, window):
+        # Show, and optionally edit, the mood logged on one day
+        self.storage.refresh()
+        mood_indexes = self.date_index.get(selected_date_str)
+        mood_entries = [self.entries[i] for i in mood_indexes]
+        if mood_entries:
+            mood_summary = f"Mood on {selected_date}:\n"
+            mood_colors = ', '.join(entry['mood'] for entry in mood_entries)
+            mood_summary += f"Moods logged: {mood_colors}\n"
+            # Get the mood color of the last entry
+            last_entry = dict(mood_entries[-1])  # A copy; stored rows are views that would show the edit
+            mood_color = MOOD_OPTIONS[last_entry['mood']]
+            messagebox.showinfo("Mood Entry", mood_summary, icon='info')
+            # Set the window color based on the mood
+            window.configure(bg=mood_color)
+
+            # Edit mood entry option
+            if messagebox.askyesno("Edit Mood Entry", "Do you want to edit the notes for this date?"):
+                new_notes = simpledialog.askstring("Edit Notes", "Enter new notes:")
+                if new_notes:
+                    # Update the last entry's notes
+                    new_entry = dict(last_entry, notes=new_notes)
+                    self.storage.update(mood_indexes[-1], new_entry)
+                    self.entry_changed(mood_indexes[-1], last_entry, new_entry)
+                    messagebox.showinfo("Success", "Mood entry updated!")
+        else:
+            messagebox.showinfo("Mood Entry", "No mood logged for this date.")
+
 if __name__ == "__main__":
     root = tk.Tk()
+    ui_monitor.enable_from_env(root)  # Set TK_UI_MONITOR=1 to profile the event loop
     app = MoodDiaryApp(root)
     root.mainloop()
+    app.close()
@@ -1,15 +1,19 @@
 import tkinter as tk
+from tkinter import messagebox
+import math
+import sys
 import time
-import json
-from playsound import playsound  # Import playsound for playing sound
-import matplotlib.pyplot as plt
-from datetime import datetime
+from datetime import datetime, timedelta
+from audio_service import get_audio_service
+from pomodoro_engine import PomodoroEngine, TimerScheduler, SESSION, SESSION_COMPLETE
+from study_store import StudyStore, chart_series
+import ui_monitor
 
 # Constants for timings
 SESSION_DURATION = 25 * 60  # 25 minutes in seconds
 SHORT_BREAK_DURATION = 5 * 60  # 5 minutes in seconds
 LONG_BREAK_DURATION = 15 * 60  # 15 minutes in seconds
-DATA_FILE = 'study_data.json'  # JSON file to store study hours
+DATA_FILE = 'study_data.json'  # Study hours; sessions and rollups are stored next to it
 
 # Customize colors and fonts
 BACKGROUND_COLOR = "#f0f8ff"  # Light blue background
@@ -20,20 +24,79 @@ FONT_NAME = "Helvetica"  # Font style
 BUTTON_FONT = (FONT_NAME, 14)  # Button font size
 TIMER_FONT = (FONT_NAME, 48)  # Timer font size
 
+BREAK_FONT_COLOR = "#ff5722"  # Timer text color during breaks
+
+# Multi-timer grid
+GRID_COLUMNS = 4
+TILE_NAME_FONT = (FONT_NAME, 12, "bold")
+TILE_TIMER_FONT = (FONT_NAME, 16)
+TILE_BUTTON_FONT = (FONT_NAME, 10)
+
+CHART_COLOR = '#4caf50'  # Green line
+CHART_GRANULARITIES = ["auto", "day", "week", "month", "year"]
+
 # Path to the bird chirping sound
 BIRD_SOUND_PATH = r"P:\birds-flapmp3-14504.mp3"
 
 
+def format_time(seconds):
+    mins, secs = divmod(seconds, 60)
+    return '{:02d}:{:02d}'.format(mins, secs)
+
+
+def timer_display(engine):
+    """Return the (text, color) a timer label should show for engine."""
+    time_left = format_time(engine.display_seconds())
+    if engine.phase == SESSION:
+        return f"Time left: {time_left}", FONT_COLOR
+    return f"Break: {time_left}", BREAK_FONT_COLOR  # Change text color for break
+
+
+def wall_time(clock, moment):
+    """Return the datetime of a moment on clock, such as a phase deadline."""
+    return datetime.now() - timedelta(seconds=clock() - moment)
+
+
+class StudyChart:
+    """Study-hours chart embedded in the Tk window and reused between refreshes."""
+
+    def __init__(self, parent):
+        # matplotlib is only imported once the chart is first shown
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        import matplotlib.dates as mdates
+
+        self.figure = Figure(figsize=(5.5, 2.8), dpi=100)
+        self.axes = self.figure.add_subplot()
+        self.line, = self.axes.plot([], [], marker='o', color=CHART_COLOR)
+        locator = mdates.AutoDateLocator()
+        self.axes.xaxis.set_major_locator(locator)
+        self.axes.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        self.axes.set_ylabel('Hours Studied')
+        self.axes.grid()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=parent)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    def update(self, granularity, dates, hours):
+        self.line.set_data(dates, hours)
+        self.line.set_marker('o' if len(dates) <= 60 else '')  # Markers only clutter dense charts
+        self.axes.set_title(f'Study Hours per {granularity.capitalize()}')
+        self.axes.relim()
+        self.axes.autoscale_view()
+        self.figure.tight_layout()
+        self.canvas.draw_idle()
+
+
 class PomodoroApp:
-    def __init__(self, root):
+    def __init__(self, root, clock=time.monotonic):
         self.root = root
         self.root.title("Pomodoro Timer")
         self.root.geometry("500x400")  # Adjusted window size for better appearance
         self.root.config(bg=BACKGROUND_COLOR)  # Set background color
-        self.is_running = False
-        self.is_paused = False
-        self.remaining_time = SESSION_DURATION
-        self.session_count = 0
+        # Session/break state machine; the UI only schedules redraws
+        self.engine = PomodoroEngine(SESSION_DURATION, SHORT_BREAK_DURATION, LONG_BREAK_DURATION, clock=clock)
+        self.displayed = None  # (text, color) currently shown on the timer label
+        self.study_store = StudyStore(DATA_FILE).load()
         
         # Timer label
         self.timer_label = tk.Label(root, text="Time left: 25:00", font=TIMER_FONT, bg=BACKGROUND_COLOR, fg=FONT_COLOR)
@@ -58,85 +121,92 @@ class PomodoroApp:
         self.log_button = tk.Button(self.button_frame, text="Log Study Hours", command=self.plot_study_hours, font=BUTTON_FONT, bg=BUTTON_COLOR, fg="white", activebackground=BUTTON_HOVER_COLOR, width=15)
         self.log_button.grid(row=1, column=0, pady=10)
 
-        self.timer_running_id = None  # Timer ID for after method
+        self.granularity = tk.StringVar(value="auto")
+        self.granularity_menu = tk.OptionMenu(self.button_frame, self.granularity, *CHART_GRANULARITIES, command=lambda _: self.refresh_chart())
+        self.granularity_menu.config(font=BUTTON_FONT, bg=BACKGROUND_COLOR)
+        self.granularity_menu.grid(row=1, column=1, pady=10)
 
-    def play_alarm(self):
-        """Play the bird chirping sound."""
-        playsound(BIRD_SOUND_PATH)
+        # Chart is created on first use and kept for later refreshes
+        self.chart_frame = tk.Frame(root, bg=BACKGROUND_COLOR)
+        self.chart = None
+        self.chart_cache = {}  # granularity -> plotted series, for chart_cache_version
+        self.chart_cache_version = None
 
-    def log_study_hours(self, hours):
-        """Log daily study hours into a JSON file."""
-        today = datetime.now().date().isoformat()
-        
-        # Load existing data
-        try:
-            with open(DATA_FILE, 'r') as file:
-                study_data = json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            study_data = {}
-        
-        # Update today's study hours
-        study_data[today] = study_data.get(today, 0) + hours
-        print(f"Logging study hours for {today}: {study_data[today]} hours")  # Debugging line
+        self.timer_running_id = None  # Timer ID for after method
+
+        # Sounds play on a background thread so the countdown never stalls
+        self.audio = get_audio_service()
+        self.audio.preload(BIRD_SOUND_PATH)
 
-        # Write back to the file
-        with open(DATA_FILE, 'w') as file:
-            json.dump(study_data, file)
+    def play_alarm(self):
+        """Play the bird chirping sound without blocking the timer."""
+        self.audio.play(BIRD_SOUND_PATH)
 
+    def log_study_hours(self, hours, end=None):
+        """Append a finished session to the study store."""
+        record = self.study_store.log_hours(hours, end=end)
+        today = record["end"][:10]
+        print(f"Logging study hours for {today}: {self.study_store.daily[today]} hours")  # Debugging line
+        self.refresh_chart()
 
     def plot_study_hours(self):
-        """Plot the study hours using matplotlib."""
-        try:
-            with open(DATA_FILE, 'r') as file:
-                study_data = json.load(file)
-            
-            dates = list(study_data.keys())
-            hours = list(study_data.values())
-
-            plt.figure(figsize=(10, 5))
-            plt.plot(dates, hours, marker='o', color='#4caf50')  # Green line
-            plt.title('Daily Study Hours', fontsize=16)
-            plt.xlabel('Date', fontsize=14)
-            plt.ylabel('Hours Studied', fontsize=14)
-            plt.xticks(rotation=45)
-            plt.grid()
-            plt.tight_layout()
-            plt.show()
-        except (FileNotFoundError, json.JSONDecodeError):
+        """Show the study hours chart inside the window."""
+        self.study_store.refresh()  # Include sessions other Pomodoro windows logged
+        if not self.study_store.daily:
             print("No study data found.")
+            return
+        if self.chart is None:
+            try:
+                import matplotlib  # Check before the window is resized for the chart
+            except ImportError:
+                messagebox.showwarning("Warning", "Install matplotlib to see the study hours chart.")
+                return
+            self.root.geometry("600x720")  # Make room for the chart
+            self.chart_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+            self.chart = StudyChart(self.chart_frame)
+        self.refresh_chart()
+
+    def refresh_chart(self):
+        """Redraw the chart from the rollups, reusing cached series."""
+        if self.chart is None:
+            return
+        if self.chart_cache_version != self.study_store.version:
+            self.chart_cache = {}  # New sessions were logged
+            self.chart_cache_version = self.study_store.version
+        granularity = self.granularity.get()
+        if granularity not in self.chart_cache:
+            self.chart_cache[granularity] = chart_series(self.study_store.daily, granularity)
+        self.chart.update(*self.chart_cache[granularity])
 
     def countdown_timer(self):
-        """Countdown timer to display remaining time."""
-        if self.remaining_time >= 0 and self.is_running:
-            mins, secs = divmod(self.remaining_time, 60)
-            timer_format = '{:02d}:{:02d}'.format(mins, secs)
-            self.timer_label.config(text=f"Time left: {timer_format}")
-            self.remaining_time -= 1  # Decrease the time remaining
-            self.timer_running_id = self.root.after(1000, self.countdown_timer)  # Call countdown_timer every second
-        elif self.is_running:
-            self.play_alarm()  # Play bird chirping sound at the end of session
-            self.session_count += 1
-            self.log_study_hours(SESSION_DURATION / 3600)  # Log hours studied
-        
-            # Decide on break duration
-            if self.session_count % 4 == 0:
-                self.start_break(LONG_BREAK_DURATION)
-            else:
-                self.start_break(SHORT_BREAK_DURATION)
+        """Handle finished phases, redraw, and sleep until the display next changes."""
+        self.timer_running_id = None
+        for event, duration, end in self.engine.poll():
+            if event == SESSION_COMPLETE:
+                self.play_alarm()  # Play bird chirping sound at the end of session
+                self.log_study_hours(duration / 3600, wall_time(self.engine.clock, end))  # Log hours studied
+        self.update_timer_label()
+        wakeup = self.engine.next_wakeup()
+        if wakeup is not None:
+            self.timer_running_id = self.root.after(max(1, math.ceil(wakeup * 1000)), self.countdown_timer)
 
-    def start_break(self, duration):
-        """Start a break session."""
-        self.timer_label.config(text="Break time!", fg="#ff5722")  # Change text color for break
-        self.root.update()
-        self.remaining_time = duration
-        self.countdown_timer()
+    def update_timer_label(self):
+        """Redraw the timer label only when the shown second or phase changes."""
+        displayed = timer_display(self.engine)
+        if displayed != self.displayed:
+            self.displayed = displayed
+            self.timer_label.config(text=displayed[0], fg=displayed[1])
+
+    def cancel_countdown(self):
+        if self.timer_running_id is not None:
+            self.root.after_cancel(self.timer_running_id)
+            self.timer_running_id = None
 
     def start_timer(self):
         """Start the timer."""
-        if not self.is_running:
-            self.is_running = True
+        if not self.engine.is_running:
+            self.engine.start()
             self.play_alarm()  # Play bird chirping sound at the start of session
-            self.remaining_time = SESSION_DURATION
             self.countdown_timer()
             self.start_button.config(state=tk.DISABLED)
             self.stop_button.config(state=tk.NORMAL)
@@ -144,30 +214,176 @@ class PomodoroApp:
 
     def stop_timer(self):
         """Stop the timer."""
-        self.is_running = False
-        if self.timer_running_id is not None:
-            self.root.after_cancel(self.timer_running_id)
-            self.timer_running_id = None
+        self.engine.stop()
+        self.cancel_countdown()
         self.start_button.config(state=tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
-        self.pause_resume_button.config(state=tk.DISABLED)
-        self.timer_label.config(text="Time left: 25:00")  # Reset timer display
+        self.pause_resume_button.config(state=tk.DISABLED, text="Pause")
+        self.update_timer_label()  # Reset timer display
 
     def pause_resume_timer(self):
         """Pause or resume the timer."""
-        if self.is_running:
-            if not self.is_paused:
-                self.is_paused = True
+        if self.engine.is_running:
+            if not self.engine.is_paused:
+                self.engine.pause()
                 self.pause_resume_button.config(text="Resume")
-                if self.timer_running_id is not None:
-                    self.root.after_cancel(self.timer_running_id)  # Stop the countdown
-                    self.timer_running_id = None
+                self.cancel_countdown()  # Stop the countdown
             else:
-                self.is_paused = False
+                self.engine.resume()
                 self.pause_resume_button.config(text="Pause")
                 self.countdown_timer()  # Resume countdown
 
+
+class TimerTile:
+    """One timer in the multi-timer grid; redraws only when what it shows changes."""
+
+    def __init__(self, parent, name, engine, on_start, on_stop, on_pause_resume):
+        self.engine = engine
+        self.displayed = None  # (text, color) on the time label
+        self.state = None  # (running, paused) the buttons were last set for
+        self.frame = tk.Frame(parent, bg=BACKGROUND_COLOR, bd=1, relief=tk.GROOVE)
+        tk.Label(self.frame, text=name, font=TILE_NAME_FONT, bg=BACKGROUND_COLOR, fg=FONT_COLOR).pack(pady=(5, 0))
+        self.time_label = tk.Label(self.frame, font=TILE_TIMER_FONT, bg=BACKGROUND_COLOR, fg=FONT_COLOR, width=16)
+        self.time_label.pack(padx=5)
+        buttons = tk.Frame(self.frame, bg=BACKGROUND_COLOR)
+        buttons.pack(pady=5)
+        button_options = dict(font=TILE_BUTTON_FONT, bg=BUTTON_COLOR, fg="white", activebackground=BUTTON_HOVER_COLOR, width=6)
+        self.start_button = tk.Button(buttons, text="Start", command=on_start, **button_options)
+        self.start_button.grid(row=0, column=0, padx=2)
+        self.stop_button = tk.Button(buttons, text="Stop", command=on_stop, **button_options)
+        self.stop_button.grid(row=0, column=1, padx=2)
+        self.pause_resume_button = tk.Button(buttons, text="Pause", command=on_pause_resume, **button_options)
+        self.pause_resume_button.grid(row=0, column=2, padx=2)
+        self.redraw()
+
+    def grid(self, row, column):
+        self.frame.grid(row=row, column=column, padx=5, pady=5)
+
+    def redraw(self):
+        displayed = timer_display(self.engine)
+        if displayed != self.displayed:
+            self.displayed = displayed
+            self.time_label.config(text=displayed[0], fg=displayed[1])
+        state = (self.engine.is_running, self.engine.is_paused)
+        if state != self.state:
+            self.state = state
+            running, paused = state
+            self.start_button.config(state=tk.DISABLED if running else tk.NORMAL)
+            self.stop_button.config(state=tk.NORMAL if running else tk.DISABLED)
+            self.pause_resume_button.config(state=tk.NORMAL if running else tk.DISABLED,
+                                            text="Resume" if paused else "Pause")
+
+
+class MultiTimerApp:
+    """Many independent Pomodoro timers in one window.
+
+    Every timer has its own engine (session/break cycle and pause state)
+    and logs finished sessions to the study store under its own name. A
+    TimerScheduler keeps their wakeups in one heap, so the window has a
+    single after() pending, for the earliest one, however many timers run.
+    """
+
+    def __init__(self, root, names=(), clock=time.monotonic):
+        self.root = root
+        self.root.title("Pomodoro Timers")
+        self.root.config(bg=BACKGROUND_COLOR)
+        self.clock = clock
+        self.scheduler = TimerScheduler(clock)
+        self.tiles = {}  # name -> TimerTile
+        self.wakeup_id = None
+        self.wakeup_due = None  # Clock time wakeup_id was scheduled for
+        self.study_store = StudyStore(DATA_FILE).load()
+        self.audio = get_audio_service()
+        self.audio.preload(BIRD_SOUND_PATH)
+
+        add_frame = tk.Frame(root, bg=BACKGROUND_COLOR)
+        add_frame.pack(pady=10)
+        self.name_entry = tk.Entry(add_frame, font=BUTTON_FONT, width=20)
+        self.name_entry.grid(row=0, column=0, padx=5)
+        self.name_entry.bind("<Return>", lambda event: self.add_from_entry())
+        self.add_button = tk.Button(add_frame, text="Add Timer", command=self.add_from_entry, font=BUTTON_FONT, bg=BUTTON_COLOR, fg="white", activebackground=BUTTON_HOVER_COLOR)
+        self.add_button.grid(row=0, column=1, padx=5)
+
+        self.grid_frame = tk.Frame(root, bg=BACKGROUND_COLOR)
+        self.grid_frame.pack(padx=10, pady=10)
+        for name in names:
+            self.add_timer(name)
+
+    def add_from_entry(self):
+        name = self.name_entry.get().strip()
+        if name:
+            self.add_timer(name)
+            self.name_entry.delete(0, tk.END)
+
+    def add_timer(self, name):
+        if name in self.tiles:
+            return
+        engine = PomodoroEngine(SESSION_DURATION, SHORT_BREAK_DURATION, LONG_BREAK_DURATION, clock=self.clock)
+        self.scheduler.add(name, engine)
+        tile = TimerTile(self.grid_frame, name, engine,
+                         on_start=lambda: self.start_timer(name),
+                         on_stop=lambda: self.stop_timer(name),
+                         on_pause_resume=lambda: self.pause_resume_timer(name))
+        tile.grid(*divmod(len(self.tiles), GRID_COLUMNS))
+        self.tiles[name] = tile
+
+    def start_timer(self, name):
+        engine = self.scheduler.timers[name]
+        if not engine.is_running:
+            engine.start()
+            self.play_alarm()
+            self.timer_changed(name)
+
+    def stop_timer(self, name):
+        self.scheduler.timers[name].stop()
+        self.timer_changed(name)
+
+    def pause_resume_timer(self, name):
+        engine = self.scheduler.timers[name]
+        if engine.is_paused:
+            engine.resume()
+        else:
+            engine.pause()
+        self.timer_changed(name)
+
+    def timer_changed(self, name):
+        self.scheduler.reschedule(name)
+        self.tiles[name].redraw()
+        self.schedule_wakeup()
+
+    def schedule_wakeup(self):
+        """Keep exactly one after() pending, for the earliest timer wakeup."""
+        due = self.scheduler.next_due()
+        if due == self.wakeup_due:
+            return
+        if self.wakeup_id is not None:
+            self.root.after_cancel(self.wakeup_id)
+        self.wakeup_id, self.wakeup_due = None, due
+        if due is not None:
+            delay = max(1, math.ceil((due - self.clock()) * 1000))
+            self.wakeup_id = self.root.after(delay, self.on_wakeup)
+
+    def on_wakeup(self):
+        self.wakeup_id = self.wakeup_due = None
+        for name, events in self.scheduler.run_due().items():
+            for event, duration, end in events:
+                if event == SESSION_COMPLETE:
+                    self.play_alarm()
+                    self.study_store.log_hours(duration / 3600, name, wall_time(self.clock, end))
+            self.tiles[name].redraw()  # Only timers that were due can have changed
+        self.schedule_wakeup()
+
+    def play_alarm(self):
+        self.audio.play(BIRD_SOUND_PATH)
+
+
 if __name__ == "__main__":
     root = tk.Tk()
-    app = PomodoroApp(root)
+    ui_monitor.enable_from_env(root)  # Set TK_UI_MONITOR=1 to profile the event loop
+    if len(sys.argv) > 1:
+        # python Pomodoro.py Alice Bob "Room 3" runs one timer per name
+        app = MultiTimerApp(root, sys.argv[1:])
+    else:
+        app = PomodoroApp(root)
     root.mainloop()
+    app.study_store.close()
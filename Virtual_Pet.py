@@ -1,31 +1,141 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import random
+import time
+from pet_sim import PetPopulation, SpatialGrid, PET_TYPES, MAX_STAT, load_population, save_population
+import ui_monitor
+
+TICK_MS = 1000  # How often hunger and happiness decay
+FRAME_MS = 33  # Animation frame interval (about 30 frames per second)
+CANVAS_WIDTH = 500
+CANVAS_HEIGHT = 400
+SAVE_FILE = "pets.dat"  # Pets are saved here on exit and restored on the next start
+
+# Canvas shape, coordinates relative to the sprite's top-left corner, and fill per pet type
+SPRITES = {
+    "Rabbit": ("oval", (0, 0, 30, 20), "pink"),
+    "Cat": ("polygon", (0, 15, 15, 0, 30, 15), "gray"),
+    "Dog": ("rectangle", (0, 0, 30, 20), "brown"),
+    "Goat": ("rectangle", (0, 0, 20, 20), "white"),
+    "Bird": ("oval", (0, 0, 20, 20), "yellow"),
+}
 
 class VirtualPet:
-    def __init__(self, name, pet_type):
-        self.name = name
-        self.pet_type = pet_type
-        self.happiness = 5
-        self.hunger = 5
+    """One pet, backed by a row of a (possibly shared) PetPopulation."""
+
+    def __init__(self, name, pet_type, population=None, x=0.0, y=0.0):
+        self.population = population if population is not None else PetPopulation()
+        self.index = self.population.add(name, pet_type, x=x, y=y)
+
+    @classmethod
+    def existing(cls, population, index):
+        """Wrap a pet that is already in the population."""
+        pet = cls.__new__(cls)
+        pet.population = population
+        pet.index = index
+        return pet
+
+    @property
+    def name(self):
+        return self.population.names[self.index]
+
+    @property
+    def pet_type(self):
+        return self.population.pet_type(self.index)
+
+    @property
+    def happiness(self):
+        return round(float(self.population.happiness[self.index]))
+
+    @property
+    def hunger(self):
+        return round(float(self.population.hunger[self.index]))
+
+    @property
+    def mood(self):
+        return self.population.mood(self.index)
 
     def feed(self):
-        if self.hunger < 10:
-            self.hunger += 1
+        if self.population.feed([self.index])[0]:
             return f"{self.name} is fed! Hunger level: {self.hunger}"
         else:
             return f"{self.name} is not hungry!"
 
     def play(self):
-        if self.happiness < 10:
-            self.happiness += 1
+        if self.population.play([self.index])[0]:
             return f"You played with {self.name}! Happiness level: {self.happiness}"
         else:
             return f"{self.name} is already very happy!"
 
     def get_status(self):
-        return (f"Happiness: {self.happiness}/10\n"
-                f"Hunger: {self.hunger}/10")
+        return (f"Happiness: {self.happiness}/{MAX_STAT}\n"
+                f"Hunger: {self.hunger}/{MAX_STAT}\n"
+                f"Mood: {self.mood}")
+
+
+class PetRenderer:
+    """Draws every pet in a population on a canvas and animates them.
+
+    Each pet gets one canvas item that is created once and then only
+    moved. A frame advances the whole population in one batch, bounces
+    pets off the edges and each other (using a SpatialGrid for neighbor
+    checks), then shifts each item by how far its pet moved.
+    """
+
+    def __init__(self, canvas, population, width=CANVAS_WIDTH, height=CANVAS_HEIGHT):
+        self.canvas = canvas
+        self.population = population
+        self.width = width
+        self.height = height
+        self.grid = SpatialGrid()
+        self.items = []  # Canvas item for each pet index
+        self.drawn_x = []  # Where each item currently is on the canvas
+        self.drawn_y = []
+        self.frame_id = None
+        self.last_frame = None
+
+    def add_pet(self, index):
+        shape, coords, fill = SPRITES[self.population.pet_type(index)]
+        x, y = float(self.population.x[index]), float(self.population.y[index])
+        points = [value + (x if i % 2 == 0 else y) for i, value in enumerate(coords)]
+        create = getattr(self.canvas, f"create_{shape}")
+        self.items.append(create(*points, fill=fill, outline="black"))
+        self.drawn_x.append(x)
+        self.drawn_y.append(y)
+
+    def highlight(self, index):
+        for i, item in enumerate(self.items):
+            self.canvas.itemconfig(item, width=3 if i == index else 1)
+
+    def pet_at(self, x, y):
+        """Return the index of the pet under canvas point (x, y), or None."""
+        for index in self.grid.nearby(x, y):
+            x1, y1, x2, y2 = self.population.bounds(index)
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                return index
+        return None
+
+    def start(self):
+        if self.frame_id is None:
+            self.last_frame = time.monotonic()
+            self.frame_id = self.canvas.after(FRAME_MS, self.frame)
+
+    def frame(self):
+        now = time.monotonic()
+        # Cap the step so a stalled event loop does not teleport the pets
+        seconds = min(now - self.last_frame, 0.25)
+        self.last_frame = now
+        self.population.move(seconds, self.width, self.height)
+        self.population.resolve_collisions(self.grid)
+
+        count = len(self.items)
+        xs = self.population.x[:count].tolist()
+        ys = self.population.y[:count].tolist()
+        move = self.canvas.move
+        for item, x, y, old_x, old_y in zip(self.items, xs, ys, self.drawn_x, self.drawn_y):
+            move(item, x - old_x, y - old_y)
+        self.drawn_x, self.drawn_y = xs, ys
+        self.frame_id = self.canvas.after(FRAME_MS, self.frame)
 
 
 class PetApp:
@@ -37,19 +147,25 @@ class PetApp:
 
         self.selected_pet_type = tk.StringVar()
         self.pet = None
+        self.population = PetPopulation()  # Stats of every pet, decayed together each tick
+        self.tick_id = None
+        self.last_tick = None
 
-        self.canvas = tk.Canvas(self.root, width=500, height=400, bg="white")
+        self.canvas = tk.Canvas(self.root, width=CANVAS_WIDTH, height=CANVAS_HEIGHT, bg="white")
         self.canvas.pack()
+        self.canvas.bind("<Button-1>", self.select_pet)
+        self.renderer = PetRenderer(self.canvas, self.population)
+        self.adopting = True  # The next pet type selection adopts a new pet
 
         self.setup_widgets()
-        self.pet_id = None  # Store the ID of the drawn pet
-        self.pet_position = [250, 200]  # Initial position of the pet
+        self.pet_position = [250, 200]  # Initial position of the first pet
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.restore_pets()
 
     def setup_widgets(self):
         ttk.Label(self.root, text="Choose your pet:", font=("Helvetica", 16), background="#f0f8ff").pack(pady=10)
         
-        pets = ["Rabbit", "Cat", "Dog", "Goat", "Bird"]
-        for pet in pets:
+        for pet in PET_TYPES:
             ttk.Radiobutton(self.root, text=pet, variable=self.selected_pet_type, value=pet, command=self.start_pet).pack(anchor='w', padx=20)
 
         # Entry for pet name with placeholder
@@ -70,6 +186,9 @@ class PetApp:
         self.play_button = ttk.Button(self.root, text="Play", command=self.play_pet, state=tk.DISABLED)
         self.play_button.pack(pady=5)
 
+        self.adopt_button = ttk.Button(self.root, text="Adopt Another", command=self.adopt_another, state=tk.DISABLED)
+        self.adopt_button.pack(pady=5)
+
         self.exit_button = ttk.Button(self.root, text="Exit", command=self.exit_app, state=tk.DISABLED)
         self.exit_button.pack(pady=5)
 
@@ -85,78 +204,86 @@ class PetApp:
 
 
     def start_pet(self):
+        if not self.adopting:
+            return
         pet_name = self.name_entry.get()
         pet_type = self.selected_pet_type.get()
-        if not pet_name or pet_type not in ["Rabbit", "Cat", "Dog", "Goat", "Bird"]:
+        if not pet_name or pet_type not in PET_TYPES:
             messagebox.showwarning("Warning", "Please enter a pet name and select a pet type.")
             return
-        self.pet = VirtualPet(pet_name, pet_type)
+        if len(self.population):
+            # Later pets appear somewhere random instead of on top of the first
+            self.pet_position = [random.uniform(0, CANVAS_WIDTH - 30), random.uniform(0, CANVAS_HEIGHT - 20)]
+        self.pet = VirtualPet(pet_name, pet_type, self.population, *self.pet_position)
+        self.renderer.add_pet(self.pet.index)  # Draw the pet once; frames only move it
+        self.pet_ready()
+
+    def pet_ready(self):
+        # Enable the controls and start the simulation once there is a pet
+        self.adopting = False
         self.name_entry.config(state=tk.DISABLED)
         self.feed_button.config(state=tk.NORMAL)
         self.play_button.config(state=tk.NORMAL)
+        self.adopt_button.config(state=tk.NORMAL)
         self.exit_button.config(state=tk.NORMAL)
         self.update_status()
         self.animate_pet()
+        if self.tick_id is None:
+            self.last_tick = time.monotonic()
+            self.tick_id = self.root.after(TICK_MS, self.tick_pets)
+
+    def restore_pets(self):
+        try:
+            population, away = load_population(SAVE_FILE)
+        except ValueError as error:
+            messagebox.showwarning("Warning", f"Could not restore your pets: {error}")
+            return
+        if population is None or not len(population):
+            return
+        # Stats already include the decay for the time away
+        self.population = self.renderer.population = population
+        for index in range(len(population)):
+            self.renderer.add_pet(index)
+        self.pet = VirtualPet.existing(population, 0)
+        self.name_entry.delete(0, tk.END)
+        self.name_entry.insert(0, self.pet.name)
+        self.name_entry.config(foreground="black")
+        self.pet_ready()
+
+    def save_pets(self):
+        if len(self.population):
+            save_population(self.population, SAVE_FILE)
 
     def update_status(self):
         if self.pet:
-            self.status_label.config(text=self.pet.get_status())
-
-    def draw_pet(self):
-        if self.pet_id:
-            self.canvas.delete(self.pet_id)
-
-        # Choose a shape for each pet type
-        if self.pet.pet_type == "Rabbit":
-            shape = self.canvas.create_oval(self.pet_position[0], self.pet_position[1],
-                                             self.pet_position[0] + 30, self.pet_position[1] + 20, fill="pink", outline="black")
-        elif self.pet.pet_type == "Cat":
-            shape = self.canvas.create_polygon(self.pet_position[0], self.pet_position[1],
-                                                self.pet_position[0] + 15, self.pet_position[1] - 15,
-                                                self.pet_position[0] + 30, self.pet_position[1],
-                                                fill="gray", outline="black")
-        elif self.pet.pet_type == "Dog":
-            shape = self.canvas.create_rectangle(self.pet_position[0], self.pet_position[1],
-                                                  self.pet_position[0] + 30, self.pet_position[1] + 20,
-                                                  fill="brown", outline="black")
-        elif self.pet.pet_type == "Goat":
-            shape = self.canvas.create_rectangle(self.pet_position[0], self.pet_position[1],
-                                                  self.pet_position[0] + 20, self.pet_position[1] + 20,
-                                                  fill="white", outline="black")
-        elif self.pet.pet_type == "Bird":
-            shape = self.canvas.create_oval(self.pet_position[0], self.pet_position[1],
-                                             self.pet_position[0] + 20, self.pet_position[1] + 20, fill="yellow", outline="black")
-
-        self.pet_id = shape
+            self.status_label.config(text=f"{self.pet.name} the {self.pet.pet_type}\n{self.pet.get_status()}")
+
+    def tick_pets(self):
+        # Decay every pet's stats by the time that actually passed
+        now = time.monotonic()
+        self.population.tick(now - self.last_tick)
+        self.last_tick = now
+        self.update_status()
+        self.tick_id = self.root.after(TICK_MS, self.tick_pets)
 
     def animate_pet(self):
-        self.draw_pet()  # Draw the pet
-        self.move_pet()  # Start moving the pet
-
-    def move_pet(self):
-        if self.pet_id:
-            # Randomly change position
-            dx = random.choice([-5, 5])  # Random move left or right
-            dy = random.choice([-5, 5])  # Random move up or down
-
-            # Get the current position of the pet
-            coords = self.canvas.coords(self.pet_id)
-            x1, y1, x2, y2 = coords
-            
-            # Calculate new position
-            new_x1 = x1 + dx
-            new_y1 = y1 + dy
-            new_x2 = x2 + dx
-            new_y2 = y2 + dy
-
-            # Check bounds
-            if new_x1 < 0 or new_x2 > 500 or new_y1 < 0 or new_y2 > 400:
-                return  # Don't move if it goes out of bounds
-
-            # Move the pet
-            self.canvas.move(self.pet_id, dx, dy)
-
-        self.root.after(100, self.move_pet)  # Move the pet every 100 ms
+        self.renderer.highlight(self.pet.index)
+        self.renderer.start()
+
+    def adopt_another(self):
+        self.adopting = True
+        self.selected_pet_type.set("")
+        self.name_entry.config(state=tk.NORMAL)
+        self.name_entry.delete(0, tk.END)
+        self.name_entry.focus_set()
+
+    def select_pet(self, event):
+        # Clicking a pet makes it the one fed, played with and shown in the status
+        index = self.renderer.pet_at(event.x, event.y)
+        if index is not None:
+            self.pet = VirtualPet.existing(self.population, index)
+            self.renderer.highlight(index)
+            self.update_status()
 
     def feed_pet(self):
         if self.pet:
@@ -171,11 +298,18 @@ class PetApp:
             self.update_status()
 
     def exit_app(self):
+        self.save_pets()
         messagebox.showinfo("Goodbye", f"Goodbye! {self.pet.name} will miss you!")
         self.root.destroy()
 
+    def close(self):
+        # Window closed without the Exit button
+        self.save_pets()
+        self.root.destroy()
+
 
 if __name__ == "__main__":
     root = tk.Tk()
+    ui_monitor.enable_from_env(root)  # Set TK_UI_MONITOR=1 to profile the event loop
     app = PetApp(root)
     root.mainloop()
@@ -0,0 +1,141 @@
+import os
+import queue
+import threading
+
+# Pending sounds beyond this are dropped rather than played late
+MAX_QUEUED_SOUNDS = 4
+
+
+class NullBackend:
+    """Used when no audio library is available (e.g. Linux or headless)."""
+
+    name = "null"
+
+    def load(self, path):
+        return None
+
+    def play(self, clip):
+        pass
+
+
+class WinsoundBackend:
+    """Plays WAV files from memory with the Windows winsound module."""
+
+    name = "winsound"
+
+    def __init__(self):
+        import winsound
+        self.winsound = winsound
+
+    def load(self, path):
+        with open(path, "rb") as file:
+            return file.read()
+
+    def play(self, clip):
+        # SND_MEMORY cannot be combined with SND_ASYNC, so this blocks the worker thread
+        self.winsound.PlaySound(clip, self.winsound.SND_MEMORY)
+
+
+class PlaysoundBackend:
+    """Plays any format supported by the playsound package."""
+
+    name = "playsound"
+
+    def __init__(self):
+        from playsound import playsound
+        self.playsound = playsound
+
+    def load(self, path):
+        # playsound decodes on every call, so only the resolved path can be cached
+        return os.path.abspath(path)
+
+    def play(self, clip):
+        self.playsound(clip)
+
+
+def _create_backend(factory):
+    try:
+        return factory()
+    except Exception:
+        return None
+
+
+class AudioService:
+    """Plays short notification sounds off the Tk thread.
+
+    Clips are loaded once and cached. Playback requests go through a
+    bounded queue to a single worker thread, so a slow or failing audio
+    device never stalls the UI. Without an audio library every call is a
+    no-op.
+    """
+
+    def __init__(self, max_queued=MAX_QUEUED_SOUNDS):
+        self.null_backend = NullBackend()
+        # Audio libraries are imported by the worker thread, off the startup path
+        self.winsound_backend = None
+        self.playsound_backend = None
+        self.clips = {}  # path -> (backend, loaded clip)
+        self.queue = queue.Queue(maxsize=max_queued)
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def preload(self, path):
+        """Load a clip in the background so its first play starts immediately."""
+        self._submit(("load", path))
+
+    def play(self, path):
+        """Queue a clip for playback; returns immediately."""
+        self._submit(("play", path))
+
+    def backend_for(self, path):
+        if self.winsound_backend is not None and path.lower().endswith(".wav"):
+            return self.winsound_backend
+        if self.playsound_backend is not None:
+            return self.playsound_backend
+        return self.null_backend
+
+    def _submit(self, job):
+        self._ensure_worker()
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            pass  # A notification that would play late is not worth queueing
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="audio-service", daemon=True)
+                self._worker.start()
+
+    def _load(self, path):
+        if path not in self.clips:
+            backend = self.backend_for(path) if os.path.exists(path) else self.null_backend
+            try:
+                self.clips[path] = (backend, backend.load(path))
+            except Exception:
+                self.clips[path] = (self.null_backend, None)
+        return self.clips[path]
+
+    def _run(self):
+        self.winsound_backend = _create_backend(WinsoundBackend)
+        self.playsound_backend = _create_backend(PlaysoundBackend)
+        while True:
+            action, path = self.queue.get()
+            backend, clip = self._load(path)
+            if action == "play":
+                try:
+                    backend.play(clip)
+                except Exception:
+                    # The device or codec is unusable; stay quiet from now on
+                    self.clips[path] = (self.null_backend, None)
+
+
+_service = None
+
+
+def get_audio_service():
+    """Return the audio service shared by every app in the process."""
+    global _service
+    if _service is None:
+        _service = AudioService()
+    return _service
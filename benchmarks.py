@@ -0,0 +1,402 @@
+"""Headless benchmark suite for storage, timers and the pet simulation.
+
+Runs without a display: the Pomodoro UI is driven through small fake Tk
+widgets and a simulated clock. All data is generated from fixed seeds in
+a scratch directory, and every timing is the median of --repeat runs, so
+results from different runs can be compared.
+
+    python benchmarks.py                       # full suite (1k, 100k, 1M entries)
+    python benchmarks.py --quick               # smaller sizes for a fast check
+    python benchmarks.py --only storage,timer  # selected groups
+    python benchmarks.py --json bench.json
+    python benchmarks.py --compare bench.json --tolerance 0.25
+"""
+import argparse
+import heapq
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tkinter
+import tracemalloc
+import types
+from datetime import date, datetime, timedelta
+
+from mood_analytics import MoodAnalytics
+from mood_index import DateIndex
+from mood_storage import JournalStorage, JsonStorage
+from study_store import StudyStore, chart_series
+import pet_sim
+
+FULL_SIZES = [1000, 100000, 1000000]
+QUICK_SIZES = [1000, 10000]
+MOODS = ["Angry", "Sad", "Exhausted", "Happy", "Overwhelmed", "Content"]
+WORDS = "walk rain coffee friend work tired gym sleep happy book movie family call cook".split()
+
+
+def timed(func, repeat):
+    """Return the median wall time of func() in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def make_entries(count, seed=1):
+    rng = random.Random(seed)
+    first = date(2000, 1, 1).toordinal()
+    return [{"date": date.fromordinal(first + i).isoformat(), "mood": rng.choice(MOODS),
+             "notes": " ".join(rng.sample(WORDS, 4))} for i in range(count)]
+
+
+def memory_per_entry(load, count):
+    """Return the bytes per entry still allocated after load() returns its result."""
+    tracemalloc.start()
+    try:
+        loaded = load()
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del loaded
+    return allocated / count
+
+
+def load_closed(storage):
+    """Load a storage and close it; a loaded table keeps its columns but drops its file handle."""
+    entries = storage.load()
+    storage.close()
+    return entries
+
+
+def app_state(storage):
+    """Load a diary the way MoodDiaryApp does: entries, date index and mood analytics."""
+    entries = load_closed(storage)
+    return entries, DateIndex(entries), MoodAnalytics(entries)
+
+
+def bench_storage(sizes, repeat, workdir):
+    results = {}
+    for size in sizes:
+        entries = make_entries(size)
+        legacy_file = os.path.join(workdir, f"legacy_{size}.json")
+        journal_file = os.path.join(workdir, f"journal_{size}.json")
+
+        json_storage = JsonStorage(legacy_file)
+        results[f"storage.json.save.{size}"] = timed(lambda: json_storage.replace_all(entries), repeat)
+        results[f"storage.json.load.{size}"] = timed(json_storage.load, repeat)
+
+        journal = JournalStorage(journal_file, moods=MOODS)
+        journal.load()
+        journal.replace_all(list(entries))
+        results[f"storage.journal.load.{size}"] = timed(
+            lambda: load_closed(JournalStorage(journal_file, moods=MOODS)), repeat)
+        # Loaded entries: JSON dicts versus the journal's column table
+        results[f"storage.json.bytes_per_entry.{size}"] = memory_per_entry(json_storage.load, size)
+        results[f"storage.journal.bytes_per_entry.{size}"] = memory_per_entry(
+            lambda: load_closed(JournalStorage(journal_file, moods=MOODS)), size)
+        # What the app holds: entries plus its date index and mood analytics
+        results[f"app.json.bytes_per_entry.{size}"] = memory_per_entry(lambda: app_state(JsonStorage(legacy_file)), size)
+        results[f"app.journal.bytes_per_entry.{size}"] = memory_per_entry(
+            lambda: app_state(JournalStorage(journal_file, moods=MOODS)), size)
+        new_entry = {"date": "2999-01-01", "mood": "Happy", "notes": "benchmark"}
+        results[f"storage.journal.add.{size}"] = timed(lambda: journal.add(dict(new_entry)), repeat)
+        results[f"storage.json.add.{size}"] = timed(lambda: json_storage.add(dict(new_entry)), max(1, repeat // 2))
+        journal.close()
+
+        # add_entry's once-per-day check: linear scan versus the date index
+        today = "2999-12-31"
+        results[f"add_entry.scan.{size}"] = timed(lambda: any(entry["date"] == today for entry in entries), repeat)
+        index = DateIndex(entries)
+        results[f"add_entry.index.{size}"] = timed(lambda: [today in index for _ in range(1000)], repeat) / 1000
+    return results
+
+
+def bench_study(years, repeat, workdir):
+    results = {}
+    rng = random.Random(2)
+    start_day = datetime(2026 - years, 1, 1, 9)
+    sessions = []
+    for day in range(years * 365):
+        for session in range(rng.randint(0, 6)):
+            begin = start_day + timedelta(days=day, minutes=30 * session)
+            sessions.append((begin, begin + timedelta(minutes=25)))
+
+    data_file = os.path.join(workdir, "study_data.json")
+    store = StudyStore(data_file).load()
+    begin = time.perf_counter()
+    for session_start, session_end in sessions:
+        store.log_session(session_start, session_end)
+    results["study.log_session.per_session"] = (time.perf_counter() - begin) * 1000 / len(sessions)
+    store.close()
+    results["study.load.checkpointed"] = timed(lambda: StudyStore(data_file).load(), repeat)
+
+    def load_without_checkpoint():
+        os.remove(store.rollup_file)
+        StudyStore(data_file).load()
+    results["study.load.full_replay"] = timed(load_without_checkpoint, repeat)
+
+    # The data the legacy plot_study_hours parsed on every click
+    legacy_file = os.path.join(workdir, "legacy_study.json")
+    with open(legacy_file, "w") as file:
+        json.dump(store.daily, file)
+
+    def legacy_prep():
+        with open(legacy_file, "r") as file:
+            study_data = json.load(file)
+        return list(study_data.keys()), list(study_data.values())
+    results["study.plot_prep.legacy"] = timed(legacy_prep, repeat)
+    for granularity in ("auto", "day", "week", "month"):
+        results[f"study.plot_prep.{granularity}"] = timed(lambda: chart_series(store.daily, granularity), repeat)
+    results["study.sessions"] = len(sessions)
+    return results
+
+
+class FakeWidget:
+    """Stands in for any Tk widget: every method call is accepted and ignored."""
+
+    def __init__(self, *args, **kwargs):
+        self.options = dict(kwargs)
+        self.config_calls = 0
+
+    def config(self, **kwargs):
+        self.options.update(kwargs)
+        self.config_calls += 1
+
+    configure = config
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class FakeStringVar:
+    def __init__(self, value=""):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class FakeRoot(FakeWidget):
+    """Runs after() callbacks on a simulated clock, each one fired late by a random jitter."""
+
+    def __init__(self, jitter_ms, callback_cost_ms, seed=3):
+        super().__init__()
+        self.now = 0.0
+        self.queue = []  # Heap of (due, after id, func, args)
+        self.cancelled = set()
+        self.next_id = 0
+        self.jitter_ms = jitter_ms
+        self.callback_cost_ms = callback_cost_ms
+        self.rng = random.Random(seed)
+        self.callbacks = 0
+        self.max_pending = 0
+
+    def clock(self):
+        return self.now
+
+    def after(self, ms, func, *args):
+        due = self.now + (ms + self.rng.uniform(0, self.jitter_ms)) / 1000
+        self.next_id += 1
+        heapq.heappush(self.queue, (due, self.next_id, func, args))
+        self.max_pending = max(self.max_pending, len(self.queue) - len(self.cancelled))
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        self.cancelled.add(after_id)
+
+    def run_until(self, seconds):
+        while self.queue and self.now < seconds:
+            due, after_id, func, args = heapq.heappop(self.queue)
+            if after_id in self.cancelled:
+                self.cancelled.discard(after_id)
+                continue
+            self.now = due
+            self.callbacks += 1
+            func(*args)
+            self.now += self.callback_cost_ms / 1000  # Time spent inside the callback
+
+
+def fake_tk_module():
+    fake = types.SimpleNamespace(**{name: getattr(tkinter, name) for name in dir(tkinter.constants) if name.isupper()})
+    fake.Label = fake.Button = fake.Frame = fake.OptionMenu = fake.Entry = FakeWidget
+    fake.StringVar = FakeStringVar
+    return fake
+
+
+def bench_timer(jitter_ms=20, callback_cost_ms=5):
+    """Simulate one 25-minute session and report how far its end drifts."""
+    import Pomodoro
+
+    real_tk = Pomodoro.tk
+    Pomodoro.tk = fake_tk_module()
+    try:
+        root = FakeRoot(jitter_ms, callback_cost_ms)
+        with tempfile.TemporaryDirectory() as workdir:
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            try:
+                app = Pomodoro.PomodoroApp(root, clock=root.clock)
+                app.play_alarm = lambda: None
+                ended = []
+                app.log_study_hours = lambda hours, end: ended.append(root.now)
+                app.start_timer()
+                root.run_until(Pomodoro.SESSION_DURATION + 60)
+            finally:
+                os.chdir(cwd)
+    finally:
+        Pomodoro.tk = real_tk
+
+    # The old loop decremented once per after(1000) and ended one tick after 00:00
+    legacy_rng = random.Random(3)
+    legacy_end = sum((1000 + legacy_rng.uniform(0, jitter_ms) + callback_cost_ms) / 1000
+                     for _ in range(Pomodoro.SESSION_DURATION + 2))
+    return {
+        "timer.session_end_drift_s": ended[0] - Pomodoro.SESSION_DURATION if ended else float("nan"),
+        "timer.legacy_session_end_drift_s": legacy_end - Pomodoro.SESSION_DURATION,
+        "timer.callbacks_per_session": root.callbacks,
+        "timer.label_redraws": app.timer_label.config_calls,
+    }
+
+
+def bench_multi_timer(count=50, jitter_ms=20, callback_cost_ms=1):
+    """Run many timers, started at staggered times, through one 25-minute session each."""
+    import Pomodoro
+
+    real_tk = Pomodoro.tk
+    Pomodoro.tk = fake_tk_module()
+    try:
+        root = FakeRoot(jitter_ms, callback_cost_ms)
+        with tempfile.TemporaryDirectory() as workdir:
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            try:
+                app = Pomodoro.MultiTimerApp(root, [f"timer{index}" for index in range(count)], clock=root.clock)
+                app.play_alarm = lambda: None
+                started, ended = {}, {}
+                app.study_store.log_hours = lambda hours, name, end: ended.setdefault(name, root.now)
+
+                def start(name):
+                    started[name] = root.now
+                    app.start_timer(name)
+
+                rng = random.Random(5)
+                for name in app.tiles:
+                    root.after(int(rng.uniform(0, 60000)), start, name)
+                # Once all timers run, the app itself should keep a single after() pending
+                root.after(61000, lambda: setattr(root, "max_pending", 0))
+                begin = time.perf_counter()
+                root.run_until(Pomodoro.SESSION_DURATION + 120)
+                elapsed = time.perf_counter() - begin
+            finally:
+                os.chdir(cwd)
+    finally:
+        Pomodoro.tk = real_tk
+    drifts = [ended[name] - started[name] - Pomodoro.SESSION_DURATION for name in ended]
+    return {
+        f"timer.multi.{count}.sessions_logged": len(ended),
+        f"timer.multi.{count}.max_session_end_drift_s": max(drifts) if drifts else float("nan"),
+        f"timer.multi.{count}.max_pending_after": root.max_pending,
+        f"timer.multi.{count}.wakeups": root.callbacks - count - 1,  # Minus the starts and the reset
+        f"timer.multi.{count}.redraws_per_timer": sum(tile.time_label.config_calls for tile in app.tiles.values()) / count,
+        f"timer.multi.{count}.simulation_ms": elapsed * 1000,
+    }
+
+
+def bench_pets(count, repeat):
+    from Virtual_Pet import VirtualPet
+
+    results = {}
+    rng = random.Random(4)
+    population = pet_sim.PetPopulation(capacity=count)
+    for index in range(count):
+        population.add(f"pet{index}", pet_sim.PET_TYPES[index % len(pet_sim.PET_TYPES)],
+                       x=rng.uniform(0, 470), y=rng.uniform(0, 380))
+    everyone = list(range(count))
+    results[f"pets.tick.{count}"] = timed(lambda: population.tick(1.0), repeat)
+    results[f"pets.feed_batch.{count}"] = timed(lambda: population.feed(everyone), repeat)
+    results[f"pets.play_batch.{count}"] = timed(lambda: population.play(everyone), repeat)
+    results[f"pets.move.{count}"] = timed(lambda: population.move(1 / 30, 500, 400), repeat)
+
+    facades = [VirtualPet.existing(population, index) for index in range(min(count, 10000))]
+    results[f"pets.facade_feed_play.{len(facades)}"] = timed(lambda: [(pet.feed(), pet.play()) for pet in facades], repeat)
+
+    # A crowded canvas: frame step with collision checks through the spatial grid
+    crowd = pet_sim.PetPopulation()
+    for index in range(500):
+        crowd.add("pet", pet_sim.PET_TYPES[index % 5], x=rng.uniform(0, 470), y=rng.uniform(0, 380))
+    grid = pet_sim.SpatialGrid()
+    results["pets.frame_with_collisions.500"] = timed(lambda: (crowd.move(1 / 30, 500, 400),
+                                                               crowd.resolve_collisions(grid)), repeat * 10)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        save_file = os.path.join(workdir, "pets.dat")
+        results[f"pets.save.{count}"] = timed(lambda: pet_sim.save_population(population, save_file), repeat)
+        results[f"pets.restore_after_30_days.{count}"] = timed(
+            lambda: pet_sim.load_population(save_file, now=time.time() + 30 * 86400), repeat)
+    results["pets.numpy"] = pet_sim.np is not None
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, value in results.items():
+        old = baseline.get(name)
+        if name.startswith("timer.") or isinstance(value, bool) or not isinstance(old, (int, float)):
+            continue
+        if old > 0 and value > old * (1 + tolerance):
+            regressions.append(f"{name}: {old:.3f} -> {value:.3f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help=f"use entry counts {QUICK_SIZES} instead of {FULL_SIZES}")
+    parser.add_argument("--only", default="storage,study,timer,pets", help="comma separated benchmark groups")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (median is reported)")
+    parser.add_argument("--pets", type=int, default=100000, help="population size for the pet benchmarks")
+    parser.add_argument("--years", type=int, default=5, help="years of study history to generate")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --json run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, as a fraction")
+    args = parser.parse_args()
+
+    groups = set(args.only.split(","))
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        if "storage" in groups:
+            results.update(bench_storage(QUICK_SIZES if args.quick else FULL_SIZES, args.repeat, workdir))
+        if "study" in groups:
+            results.update(bench_study(args.years, args.repeat, workdir))
+    if "timer" in groups:
+        results.update(bench_timer())
+        results.update(bench_multi_timer())
+    if "pets" in groups:
+        results.update(bench_pets(10000 if args.quick else args.pets, args.repeat))
+
+    width = max(len(name) for name in results)
+    for name, value in results.items():
+        unit = "" if name.startswith(("timer.", "study.sessions", "pets.numpy")) else " ms"
+        if ".bytes_per_entry." in name:
+            unit = " B"
+        print(f"{name:<{width}}  {value:12.4f}{unit}" if isinstance(value, float) else f"{name:<{width}}  {value!s:>12}")
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=4)
+    if args.compare:
+        with open(args.compare, "r") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
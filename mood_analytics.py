@@ -0,0 +1,151 @@
+from array import array
+from collections import Counter
+from datetime import date
+
+MAX_DAY_CODE = 255  # Day moods are stored as 1 + mood code in one byte
+
+
+class _Series:
+    """Array over consecutive keys (days, weeks or months), from the earliest key seen."""
+
+    def __init__(self, typecode):
+        self.values = array(typecode)
+        self.first = 0  # Key of values[0]
+
+    def get(self, key):
+        position = key - self.first
+        return self.values[position] if 0 <= position < len(self.values) else 0
+
+    def add(self, key, delta):
+        self.values[self._reserve(key)] += delta
+
+    def set(self, key, value):
+        self.values[self._reserve(key)] = value
+
+    def _reserve(self, key):
+        values = self.values
+        if not values:
+            self.first = key
+        elif key < self.first:
+            # Grow the front by at least the current length, so entries
+            # added in reverse date order do not copy the array each time
+            grow = max(self.first - key, len(values))
+            values[0:0] = array(values.typecode, bytes(values.itemsize * grow))
+            self.first -= grow
+        position = key - self.first
+        if position >= len(values):
+            values.frombytes(bytes(values.itemsize * (position + 1 - len(values))))
+        return position
+
+
+class MoodAnalytics:
+    """Running mood aggregates, updated per entry instead of recomputed.
+
+    Keeps mood counts per ISO week and per month, the mood shown for each
+    day (the last one logged), and runs of consecutive logged days for
+    streaks. Adding an entry touches only its own week, month and run.
+
+    Counts and day moods live in arrays indexed by week, month or day
+    ordinal, with moods as small codes, so a diary costs a few bytes per
+    day rather than a dict slot and a string. Given an EntryTable, the
+    aggregates are built straight from its columns.
+    """
+
+    def __init__(self, entries=()):
+        self.mood_names = []  # Mood code -> name, codes assigned as moods appear
+        self._mood_codes = {}
+        self._weekly = {}  # Mood code -> _Series of counts per week ((ordinal - 1) // 7)
+        self._monthly = {}  # Mood code -> _Series of counts per month (year * 12 + month - 1)
+        self._day_moods = _Series("B")  # Per day ordinal: 1 + code of the last mood logged, 0 if none
+        self._odd_day_moods = {}  # Day ordinal -> mood, for codes too large for one byte
+        self._run_end = {}  # first ordinal of a run of logged days -> last ordinal
+        self._run_start = {}  # last ordinal of a run -> first ordinal
+        self.longest_streak = 0
+        if hasattr(entries, "ordinals"):
+            for index in range(len(entries)):
+                if index in entries.irregular:
+                    self.add(entries[index])
+                else:
+                    self._add(entries.ordinals[index], entries.mood_names[entries.moods[index]])
+        else:
+            for entry in entries:
+                self.add(entry)
+
+    def add(self, entry):
+        self._add(date.fromisoformat(entry["date"]).toordinal(), entry["mood"])
+
+    def update(self, old_entry, new_entry, is_last_for_day=True):
+        if old_entry["mood"] == new_entry["mood"] and old_entry["date"] == new_entry["date"]:
+            return  # Only the notes changed
+        self._count(date.fromisoformat(old_entry["date"]).toordinal(), self._code(old_entry["mood"]), -1)
+        ordinal = date.fromisoformat(new_entry["date"]).toordinal()
+        self._count(ordinal, self._code(new_entry["mood"]), 1)
+        if is_last_for_day:
+            self._set_day_mood(ordinal, new_entry["mood"])
+
+    def day_mood(self, day):
+        """Return the mood shown for an ISO date (its last entry's), or None."""
+        ordinal = date.fromisoformat(day).toordinal()
+        code = self._day_moods.get(ordinal)
+        return self.mood_names[code - 1] if code else self._odd_day_moods.get(ordinal)
+
+    def month_counts(self, year, month):
+        return self._counts(self._monthly, year * 12 + month - 1)
+
+    def week_counts(self, year, week):
+        return self._counts(self._weekly, (date.fromisocalendar(year, week, 1).toordinal() - 1) // 7)
+
+    def dominant_mood(self, counts):
+        """Return the most frequent mood in a period's counts, or None."""
+        common = counts.most_common(1)
+        return common[0][0] if common else None
+
+    def current_streak(self, today=None):
+        """Return the number of consecutive logged days ending today or yesterday."""
+        today = (today or date.today()).toordinal()
+        for last in (today, today - 1):
+            if last in self._run_start:
+                return last - self._run_start[last] + 1
+        return 0
+
+    def _add(self, ordinal, mood):
+        self._count(ordinal, self._code(mood), 1)
+        if not self._day_moods.get(ordinal) and ordinal not in self._odd_day_moods:
+            self._extend_runs(ordinal)
+        self._set_day_mood(ordinal, mood)
+
+    def _code(self, mood):
+        code = self._mood_codes.get(mood)
+        if code is None:
+            code = self._mood_codes[mood] = len(self.mood_names)
+            self.mood_names.append(mood)
+        return code
+
+    def _set_day_mood(self, ordinal, mood):
+        code = self._code(mood)
+        if code + 1 < MAX_DAY_CODE:
+            self._day_moods.set(ordinal, code + 1)
+            self._odd_day_moods.pop(ordinal, None)
+        else:
+            self._day_moods.set(ordinal, 0)
+            self._odd_day_moods[ordinal] = mood
+
+    def _counts(self, table, key):
+        return Counter({self.mood_names[code]: series.get(key) for code, series in table.items()
+                        if series.get(key) > 0})
+
+    def _count(self, ordinal, code, delta):
+        day = date.fromordinal(ordinal)
+        for table, key in ((self._weekly, (ordinal - 1) // 7), (self._monthly, day.year * 12 + day.month - 1)):
+            series = table.get(code)
+            if series is None:
+                series = table[code] = _Series("i")
+            series.add(key, delta)
+
+    def _extend_runs(self, ordinal):
+        # Merge the new day with the runs ending just before and starting just after it
+        start = self._run_start.pop(ordinal - 1, ordinal)
+        end = self._run_end.pop(ordinal + 1, ordinal)
+        self._run_end[start] = end
+        self._run_start[end] = start
+        self.longest_streak = max(self.longest_streak, end - start + 1)
@@ -0,0 +1,16 @@
+"""Settings shared by the Mood Diary app and the mood_io command line tool."""
+
+DATA_FILE = "mood_diary.json"
+
+# Mood options and their color coding
+MOOD_OPTIONS = {
+    "Angry": "red",
+    "Sad": "blue",
+    "Exhausted": "gray",
+    "Happy": "yellow",
+    "Overwhelmed": "orange",
+    "Content": "green"
+}
+
+# Storage backend: "journal" (append-only log + snapshots) or "json" (single file)
+STORAGE_BACKEND = "journal"
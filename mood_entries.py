@@ -0,0 +1,292 @@
+import json
+import os
+import threading
+from array import array
+from collections.abc import Mapping
+from contextlib import nullcontext
+from datetime import date
+
+FIELDS = ("date", "mood", "notes")
+
+# offsets value for an entry whose notes are held in memory, not in the snapshot
+IN_MEMORY = -1
+
+MAX_MOODS = 256  # Mood codes are single bytes
+
+# Entries materialized per lock hold by EntryTable.iter_dicts()
+ITER_BATCH = 1000
+
+
+class SnapshotReader:
+    """Open handle on the snapshot file that entry offsets point into.
+
+    The handle is opened as soon as the offsets are read, so the notes
+    stay readable on POSIX even after another process replaces the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+        self.position = 0
+        self.reopen()
+
+    def reopen(self):
+        self.file = open(self.path, "rb")
+        self.position = 0
+
+    def read(self, offset):
+        """Return the record on the line starting at offset. Call with lock held."""
+        if offset != self.position:
+            self.file.seek(offset)
+        line = self.file.readline()
+        self.position = offset + len(line)
+        return json.loads(line)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class LazyEntry(Mapping):
+    """Read-only view of one entry in an EntryTable; notes are read on access."""
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def __getitem__(self, key):
+        return self.table.field(self.index, key)
+
+    def __iter__(self):
+        return iter(self.table.keys(self.index))
+
+    def __len__(self):
+        return len(self.table.keys(self.index))
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class EntryTable:
+    """Diary entries stored column by column instead of as one dict each.
+
+    Dates are day ordinals, moods are one-byte codes into mood_names
+    (seeded from MOOD_OPTIONS), and notes are the offset of the entry's
+    line in the snapshot, read only when asked for. Notes of entries
+    added or edited since the snapshot was written are held in memory
+    until a compaction moves them into the next snapshot. An entry that
+    does not fit the columns (an odd date, extra keys) is kept whole.
+
+    Indexing returns a LazyEntry view, which reads like the entry dict;
+    iter_dicts() reads entries in bulk.
+    """
+
+    def __init__(self, mood_names=(), snapshot=None):
+        self.mood_names = list(mood_names)
+        self._mood_codes = {name: code for code, name in enumerate(self.mood_names)}
+        self.ordinals = array("i")
+        self.moods = bytearray()
+        self.offsets = array("q")  # Snapshot line offset, or IN_MEMORY
+        self.note_hashes = array("q")  # Spots edited notes without reading them
+        self.notes = {}  # index -> notes held in memory
+        self.irregular = {}  # index -> entry dict that does not fit the columns
+        self.snapshot = snapshot  # SnapshotReader the offsets point into
+        self._edited = None  # Indexes changed since capture(), while a compaction runs
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.ordinals)
+        if not 0 <= index < len(self.ordinals):
+            raise IndexError("entry index out of range")
+        return LazyEntry(self, index)
+
+    def __setitem__(self, index, entry):
+        self._store(index, entry, IN_MEMORY)
+        if self._edited is not None:
+            self._edited.add(index)
+
+    def __iter__(self):
+        for index in range(len(self.ordinals)):
+            yield LazyEntry(self, index)
+
+    def append(self, entry, offset=IN_MEMORY):
+        """Add an entry; offset is where its line starts in the snapshot, if it is there."""
+        index = len(self.ordinals)
+        columns = self._columns(entry)
+        if columns is None:
+            columns, offset = (0, 0, ""), IN_MEMORY
+            self.irregular[index] = dict(entry)
+        ordinal, code, notes = columns
+        self.ordinals.append(ordinal)
+        self.moods.append(code)
+        self.note_hashes.append(hash(notes))
+        self.offsets.append(offset)
+        if offset == IN_MEMORY and index not in self.irregular:
+            self.notes[index] = notes
+
+    def field(self, index, key):
+        if index in self.irregular:
+            return self.irregular[index][key]
+        if key == "date":
+            return date.fromordinal(self.ordinals[index]).isoformat()
+        if key == "mood":
+            return self.mood_names[self.moods[index]]
+        if key == "notes":
+            return self._notes(index)
+        raise KeyError(key)
+
+    def keys(self, index):
+        entry = self.irregular.get(index)
+        return FIELDS if entry is None else tuple(entry)
+
+    def iter_dicts(self):
+        """Yield every entry as a plain dict, reading the snapshot sequentially."""
+        index = 0
+        while index < len(self.ordinals):
+            snapshot = self.snapshot
+            with snapshot.lock if snapshot is not None else nullcontext():
+                if snapshot is not self.snapshot:
+                    continue  # A compaction moved the notes meanwhile
+                end = min(len(self.ordinals), index + ITER_BATCH)
+                rows = [self._dict(row) for row in range(index, end)]
+            yield from rows
+            index = end
+
+    def capture(self):
+        """Return a copy for a background compaction and start tracking edits."""
+        copy = EntryTable.__new__(EntryTable)
+        copy.mood_names = list(self.mood_names)
+        copy._mood_codes = dict(self._mood_codes)
+        copy.ordinals = array("i", self.ordinals)
+        copy.moods = bytearray(self.moods)
+        copy.offsets = array("q", self.offsets)
+        copy.note_hashes = array("q", self.note_hashes)
+        copy.notes = dict(self.notes)
+        copy.irregular = dict(self.irregular)
+        copy.snapshot = self.snapshot  # Shared, with its lock, so reads never interleave
+        copy._edited = None
+        self._edited = set()
+        return copy
+
+    def release_capture(self):
+        self._edited = None
+
+    def replace_snapshot(self, tmp_path, path, offsets):
+        """Move a new snapshot holding the first len(offsets) entries into place.
+
+        Unedited entries then read their notes from the new file, and their
+        in-memory notes are dropped.
+        """
+        old = self.snapshot
+        with old.lock if old is not None else nullcontext():
+            if old is not None:
+                old.close()  # Windows cannot replace a file that is open
+            try:
+                os.replace(tmp_path, path)
+            except OSError:
+                if old is not None:
+                    old.reopen()
+                raise
+            new = SnapshotReader(path)
+            # Readers check self.snapshot under its lock, so switch it only once
+            # the offsets point into the new file, and hold the new lock meanwhile
+            with new.lock:
+                count = len(offsets)
+                edited = self._edited or set()
+                self._edited = None
+                self.offsets[:count] = offsets
+                for index in edited | set(self.irregular):
+                    if index < count:
+                        self.offsets[index] = IN_MEMORY
+                self.snapshot = new
+                self.notes = {index: notes for index, notes in self.notes.items()
+                              if index >= count or index in edited}
+
+    def assign(self, other):
+        """Take over another table's contents in place, for holders of this table."""
+        # The old snapshot is left open: a running compaction may still read it
+        self.__dict__.update(other.__dict__)
+
+    def changes_since(self, old):
+        """Return (index, old entry or None) for entries that differ from old.
+
+        Returns None if entries were removed, since that can not be
+        expressed as per-entry changes.
+        """
+        if len(self) < len(old):
+            return None
+        changes = []
+        for index in range(len(old)):
+            if index in self.irregular or index in old.irregular:
+                changed = self.irregular.get(index) != old.irregular.get(index)
+            else:
+                changed = (self.ordinals[index] != old.ordinals[index]
+                           or self.note_hashes[index] != old.note_hashes[index]
+                           or self.mood_names[self.moods[index]] != old.mood_names[old.moods[index]])
+            if changed:
+                changes.append((index, dict(old[index])))
+        changes.extend((index, None) for index in range(len(old), len(self)))
+        return changes
+
+    def close(self):
+        if self.snapshot is not None:
+            self.snapshot.close()
+
+    def _store(self, index, entry, offset):
+        self.irregular.pop(index, None)
+        self.notes.pop(index, None)
+        columns = self._columns(entry)
+        if columns is None:
+            self.irregular[index] = dict(entry)
+            self.offsets[index] = IN_MEMORY
+            return
+        self.ordinals[index], self.moods[index], notes = columns
+        self.note_hashes[index] = hash(notes)
+        self.offsets[index] = offset
+        if offset == IN_MEMORY:
+            self.notes[index] = notes
+
+    def _columns(self, entry):
+        """Return (ordinal, mood code, notes), or None if the entry does not fit the columns."""
+        day, mood, notes = entry.get("date"), entry.get("mood"), entry.get("notes")
+        code = self._mood_codes.get(mood)
+        if code is None:
+            if not isinstance(mood, str) or len(self.mood_names) >= MAX_MOODS:
+                return None
+            code = self._mood_codes[mood] = len(self.mood_names)
+            self.mood_names.append(mood)
+        # Only canonical YYYY-MM-DD dates, so the text comes back unchanged
+        if (not isinstance(notes, str) or len(entry) != len(FIELDS) or not isinstance(day, str)
+                or len(day) != 10 or day[4] != "-" or day[7] != "-"):
+            return None
+        try:
+            return date.fromisoformat(day).toordinal(), code, notes
+        except ValueError:
+            return None
+
+    def _notes(self, index):
+        notes = self.notes.get(index)
+        if notes is not None:
+            return notes
+        while True:
+            snapshot = self.snapshot
+            with snapshot.lock:
+                if snapshot is self.snapshot:
+                    return snapshot.read(self.offsets[index])["notes"]
+
+    def _dict(self, index):
+        entry = self.irregular.get(index)
+        if entry is not None:
+            return dict(entry)
+        notes = self.notes.get(index)
+        if notes is None:
+            notes = self.snapshot.read(self.offsets[index])["notes"]
+        return {"date": date.fromordinal(self.ordinals[index]).isoformat(),
+                "mood": self.mood_names[self.moods[index]], "notes": notes}
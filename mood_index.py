@@ -0,0 +1,157 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from calendar import monthrange
+from datetime import date
+
+
+def date_ordinal(text):
+    """Return the day ordinal of a YYYY-MM-DD date, or None for any other text."""
+    if not isinstance(text, str) or len(text) != 10:
+        return None
+    try:
+        return date.fromisoformat(text).toordinal()
+    except ValueError:
+        return None
+
+
+def bound_ordinal(text):
+    """Return the day ordinal of a range bound; a day past the month's end (as in "-31") is clamped."""
+    year, month, day = (int(part) for part in text.split("-"))
+    return date(year, month, max(1, min(day, monthrange(year, month)[1]))).toordinal()
+
+
+class DateIndex:
+    """Sorted index from ISO date strings to positions in the entry list.
+
+    Entries are kept as two parallel arrays, day ordinals in sorted order
+    and the entry index of each, so the index costs 8 bytes per entry.
+    Lookups and range bounds are binary searches over the ordinals, so
+    they stay O(log n) however long the diary gets. Given an EntryTable,
+    the index is built straight from its ordinal column.
+    """
+
+    def __init__(self, entries=()):
+        self._ordinals = array("i")  # One per entry, sorted; a day's entries in insertion order
+        self._indexes = array("i")  # Entry index for each slot of _ordinals
+        self._other = {}  # Date text that is not YYYY-MM-DD -> entry indexes
+        self._days = 0  # Distinct dates in _ordinals
+        if hasattr(entries, "ordinals"):
+            self._build(entries)
+        else:
+            for index, entry in enumerate(entries):
+                self.add(index, entry)
+
+    def __len__(self):
+        return self._days + len(self._other)
+
+    def __contains__(self, date):
+        ordinal = date_ordinal(date)
+        if ordinal is None:
+            return date in self._other
+        position = bisect_left(self._ordinals, ordinal)
+        return position < len(self._ordinals) and self._ordinals[position] == ordinal
+
+    def add(self, index, entry):
+        ordinal = date_ordinal(entry["date"])
+        if ordinal is None:
+            self._other.setdefault(entry["date"], []).append(index)
+            return
+        if not self._ordinals or ordinal >= self._ordinals[-1]:
+            position = len(self._ordinals)  # Common case: logging today
+        else:
+            position = bisect_right(self._ordinals, ordinal)
+        if position == 0 or self._ordinals[position - 1] != ordinal:
+            self._days += 1
+        self._ordinals.insert(position, ordinal)
+        self._indexes.insert(position, index)
+
+    def update(self, index, old_entry, new_entry):
+        if old_entry["date"] == new_entry["date"]:
+            return
+        ordinal = date_ordinal(old_entry["date"])
+        if ordinal is None:
+            positions = self._other[old_entry["date"]]
+            positions.remove(index)
+            if not positions:
+                del self._other[old_entry["date"]]
+        else:
+            start, end = self._span(ordinal, ordinal)
+            position = start + self._indexes[start:end].index(index)
+            del self._ordinals[position]
+            del self._indexes[position]
+            if end - start == 1:
+                self._days -= 1
+        self.add(index, new_entry)
+
+    def get(self, date):
+        """Return the indexes of all entries logged on date."""
+        ordinal = date_ordinal(date)
+        if ordinal is None:
+            return list(self._other.get(date, ()))
+        start, end = self._span(ordinal, ordinal)
+        return self._indexes[start:end].tolist()
+
+    def latest(self, date):
+        """Return the index of the last entry logged on date, or None."""
+        ordinal = date_ordinal(date)
+        if ordinal is None:
+            positions = self._other.get(date)
+            return positions[-1] if positions else None
+        start, end = self._span(ordinal, ordinal)
+        return self._indexes[end - 1] if end > start else None
+
+    def dates_between(self, start, end):
+        """Return the distinct logged dates with start <= date <= end."""
+        first, last = self._span(bound_ordinal(start), bound_ordinal(end))
+        dates, previous = [], None
+        for ordinal in self._ordinals[first:last]:
+            if ordinal != previous:
+                dates.append(date.fromordinal(ordinal).isoformat())
+                previous = ordinal
+        return dates
+
+    def between(self, start, end):
+        """Yield entry indexes with start <= date <= end, in date order."""
+        first, last = self._span(bound_ordinal(start), bound_ordinal(end))
+        yield from self._indexes[first:last]
+
+    def count_between(self, start, end):
+        return len(self.dates_between(start, end))
+
+    def month(self, year, month):
+        """Yield entry indexes logged in the given month, in date order."""
+        prefix = f"{year:04d}-{month:02d}"
+        return self.between(prefix + "-01", prefix + "-31")
+
+    def first_date(self):
+        return date.fromordinal(self._ordinals[0]).isoformat() if self._ordinals else None
+
+    def last_date(self):
+        return date.fromordinal(self._ordinals[-1]).isoformat() if self._ordinals else None
+
+    def _span(self, first, last):
+        """Return the slot range holding ordinals first through last."""
+        return bisect_left(self._ordinals, first), bisect_right(self._ordinals, last)
+
+    def _build(self, table):
+        # Sort once instead of inserting entry by entry; the sort is stable,
+        # so a day's entries stay in index (insertion) order
+        keys = array("i", table.ordinals)
+        for index, entry in table.irregular.items():
+            ordinal = date_ordinal(entry.get("date"))
+            if ordinal is None:
+                keys[index] = 0
+                if "date" in entry:
+                    self._other.setdefault(entry["date"], []).append(index)
+            else:
+                keys[index] = ordinal
+        order = sorted((index for index in range(len(keys)) if keys[index]), key=keys.__getitem__)
+        self._indexes = array("i", order)
+        self._ordinals = array("i", (keys[index] for index in order))
+        previous = None
+        for ordinal in self._ordinals:
+            if ordinal != previous:
+                self._days += 1
+                previous = ordinal
+        for positions in self._other.values():
+            positions.sort()
@@ -0,0 +1,279 @@
+"""Streaming import and export of Mood Diary entries as NDJSON or CSV.
+
+    python mood_io.py export backup.ndjson
+    python mood_io.py export backup.csv
+    python mood_io.py import old_diary.csv --on-duplicate replace
+
+Entries are read, validated and written one chunk at a time, so backups
+and migrations of any size go through in bounded memory. Use "-" as the
+path for stdin or stdout.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from datetime import date
+
+from mood_config import DATA_FILE, MOOD_OPTIONS, STORAGE_BACKEND
+from mood_index import DateIndex
+from mood_storage import STORAGE_BACKENDS, open_storage
+from persistence import atomic_write_chunks, encode_record
+
+FORMATS = ("ndjson", "csv")
+CSV_FIELDS = ["date", "mood", "notes"]
+
+# What to do with an imported entry whose date is already in the diary
+DUPLICATE_POLICIES = ("skip", "replace", "error")
+
+# Entries per storage write or output write
+CHUNK_SIZE = 1000
+
+# Most journal records (and so notes held in memory) an import lets pile up before compacting
+IMPORT_COMPACT_RECORDS = 100_000
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    extension = os.path.splitext(path)[1].lower()
+    if path == "-" or extension in (".ndjson", ".jsonl"):
+        return "ndjson"
+    if extension == ".csv":
+        return "csv"
+    raise ValueError(f"Cannot tell the format of {path}; pass --format")
+
+
+class DateSet:
+    """Set of ISO dates kept as a bitmap over date ordinals, one bit per day."""
+
+    def __init__(self, dates=()):
+        self.bits = bytearray()
+        for day in dates:
+            self.add(day)
+
+    def add(self, day):
+        ordinal = date.fromisoformat(day).toordinal()
+        byte = ordinal >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte + 1 - len(self.bits)))
+        self.bits[byte] |= 1 << (ordinal & 7)
+
+    def __contains__(self, day):
+        ordinal = date.fromisoformat(day).toordinal()
+        byte = ordinal >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] & (1 << (ordinal & 7)))
+
+
+def read_ndjson(file):
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            raise ValueError(f"Line {number}: not valid JSON") from None
+
+
+def read_csv(file):
+    reader = csv.DictReader(file)
+    missing = {"date", "mood"} - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"CSV header is missing {', '.join(sorted(missing))}")
+    yield from reader
+
+
+def validate_entries(records, moods=MOOD_OPTIONS):
+    """Yield records as clean diary entries, raising ValueError at the first bad one."""
+    for number, record in enumerate(records, 1):
+        if not isinstance(record, dict):
+            raise ValueError(f"Record {number}: expected an object with date, mood and notes")
+        try:
+            day = date.fromisoformat(str(record.get("date"))).isoformat()
+        except ValueError:
+            raise ValueError(f"Record {number}: invalid date {record.get('date')!r}") from None
+        mood = record.get("mood")
+        if mood not in moods:
+            raise ValueError(f"Record {number}: unknown mood {mood!r}, expected one of {', '.join(moods)}")
+        notes = record.get("notes") or ""
+        if not isinstance(notes, str):
+            raise ValueError(f"Record {number}: notes must be text")
+        yield {"date": day, "mood": mood, "notes": notes}
+
+
+def read_entries(path, fmt=None):
+    """Yield validated entries from an NDJSON or CSV file ("-" for stdin)."""
+    reader = read_csv if detect_format(path, fmt) == "csv" else read_ndjson
+    if path == "-":
+        yield from validate_entries(reader(sys.stdin))
+        return
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        yield from validate_entries(reader(file))
+
+
+def import_entries(storage, entries, on_duplicate="skip", chunk_size=CHUNK_SIZE, dry_run=False):
+    """Add entries to a loaded storage, chunk_size at a time.
+
+    Duplicate dates, against the diary or earlier in the import, are
+    skipped, replace the latest entry for that date, or raise ValueError,
+    depending on on_duplicate. Returns counts of added, replaced and
+    skipped entries. With dry_run nothing is written.
+
+    A journal storage is compacted along the way, once its journal
+    reaches compact_threshold or half the diary (at most
+    IMPORT_COMPACT_RECORDS), so the notes of imported entries do not pile
+    up in memory. The json backend rewrites its whole file on every
+    write, which per chunk would be quadratic, so it is written once at
+    the end instead.
+    """
+    if on_duplicate not in DUPLICATE_POLICIES:
+        raise ValueError(f"on_duplicate must be one of {', '.join(DUPLICATE_POLICIES)}")
+    journaled = hasattr(storage, "journal_records")
+    seen = DateSet(entry["date"] for entry in storage.entries)
+    date_index = None  # Built on the first replacement of an entry already stored
+    pending, pending_dates, updates = [], {}, []
+    counts = {"added": 0, "replaced": 0, "skipped": 0}
+
+    def compact_at():
+        # Each compaction rewrites the whole snapshot, so let the journal grow
+        # with the diary to keep the total writes linear, up to a fixed cap
+        limit = min(len(storage.entries) // 2, IMPORT_COMPACT_RECORDS)
+        return max(storage.compact_threshold, limit)
+
+    def flush():
+        if not dry_run:
+            indexes = storage.append_many(pending) if pending else []
+            if updates:
+                storage.update_many(updates)
+            if journaled and storage.journal_records >= compact_at():
+                storage.compact(background=False)
+            if date_index is not None:
+                for index, entry in zip(indexes, pending):
+                    date_index.add(index, entry)
+        pending.clear()
+        pending_dates.clear()
+        updates.clear()
+
+    for entry in entries:
+        day = entry["date"]
+        if day not in seen:
+            seen.add(day)
+            pending_dates[day] = len(pending)
+            pending.append(entry)
+            counts["added"] += 1
+        elif on_duplicate == "skip":
+            counts["skipped"] += 1
+        elif on_duplicate == "error":
+            raise ValueError(f"The diary already has an entry for {day}")
+        else:
+            counts["replaced"] += 1
+            if day in pending_dates:
+                pending[pending_dates[day]] = entry
+            elif not dry_run:
+                if date_index is None:
+                    date_index = DateIndex(storage.entries)
+                updates.append((date_index.latest(day), entry))
+        if journaled and len(pending) + len(updates) >= chunk_size:
+            flush()
+    flush()
+    if journaled and not dry_run and storage.journal_records:
+        storage.compact(background=False)
+    return counts
+
+
+def import_file(storage, path, fmt=None, on_duplicate="skip", chunk_size=CHUNK_SIZE):
+    """Import a file into a loaded storage and return the counts.
+
+    A file is checked in full first, so a bad record halfway through
+    does not leave a half-finished import. Stdin can only be read once,
+    so it is imported up to the first bad record (into a json diary,
+    not at all).
+    """
+    if path != "-":
+        import_entries(storage, read_entries(path, fmt), on_duplicate, chunk_size, dry_run=True)
+    return import_entries(storage, read_entries(path, fmt), on_duplicate, chunk_size)
+
+
+def encode_chunks(entries, fmt, chunk_size=CHUNK_SIZE):
+    """Yield the encoded file as byte chunks of at most chunk_size entries."""
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction="ignore", lineterminator="\n")
+        writer.writeheader()
+    rows = 0
+    for entry in entries:
+        if writer is None:
+            buffer.write(encode_record(entry))
+        else:
+            writer.writerow(entry)
+        rows += 1
+        if rows >= chunk_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def export_file(storage, path, fmt=None, chunk_size=CHUNK_SIZE):
+    """Stream every entry to path ("-" for stdout) and return how many were written.
+
+    The storage does not need to be loaded; an unloaded journal diary is
+    read straight from its snapshot, and a legacy mood_diary.json is read
+    without being migrated.
+    """
+    exported = 0
+
+    def counted():
+        nonlocal exported
+        for entry in storage.iter_entries():
+            exported += 1
+            yield entry
+
+    chunks = encode_chunks(counted(), detect_format(path, fmt), chunk_size)
+    if path == "-":
+        for chunk in chunks:
+            sys.stdout.buffer.write(chunk)
+        sys.stdout.buffer.flush()
+    else:
+        atomic_write_chunks(path, chunks)
+    return exported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-file", default=DATA_FILE, help="diary to read or update")
+    parser.add_argument("--backend", default=STORAGE_BACKEND, choices=sorted(STORAGE_BACKENDS))
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="entries per write")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="write every entry to a file")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    import_parser = commands.add_parser("import", help="add entries from a file")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    import_parser.add_argument("--on-duplicate", choices=DUPLICATE_POLICIES, default="skip",
+                               help="what to do with a date that already has an entry")
+    args = parser.parse_args()
+
+    storage = open_storage(args.data_file, args.backend, moods=MOOD_OPTIONS)
+    try:
+        if args.command == "export":
+            exported = export_file(storage, args.path, args.format, args.chunk_size)
+            print(f"Exported {exported} entries to {args.path}", file=sys.stderr)
+        else:
+            storage.load()
+            counts = import_file(storage, args.path, args.format, args.on_duplicate, args.chunk_size)
+            print(f"Imported {counts['added']} entries, replaced {counts['replaced']}, "
+                  f"skipped {counts['skipped']} duplicates", file=sys.stderr)
+    except (OSError, ValueError) as error:
+        parser.exit(1, f"Error: {error}\n")
+    finally:
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import json
+import os
+import re
+from bisect import bisect_left
+
+from persistence import atomic_write
+
+INDEX_VERSION = 1
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+QUERY_PATTERN = re.compile(r"(\w+)(\*?)", re.UNICODE)
+
+
+def tokenize(text):
+    """Split text into the set of lowercase word tokens it contains."""
+    return set(TOKEN_PATTERN.findall(text.lower()))
+
+
+def entry_tokens(entry):
+    return tokenize(entry["notes"] or "") | tokenize(entry["mood"])
+
+
+def search_index_path(data_file):
+    base, _ = os.path.splitext(data_file)
+    return base + ".search.json"
+
+
+class SearchIndex:
+    """Inverted index from note and mood tokens to entry positions.
+
+    The index is built on the first query (or loaded from index_file when
+    its storage version still matches) and is then kept current by add()
+    and update() rather than being rebuilt.
+    """
+
+    def __init__(self, entries, index_file=None, storage_version=None):
+        self.entries = entries
+        self.index_file = index_file
+        self.storage_version = storage_version
+        self._postings = None  # token -> set of entry indexes, built lazily
+        self._vocabulary = None  # Sorted tokens for prefix queries, rebuilt on demand
+
+    @property
+    def built(self):
+        return self._postings is not None
+
+    def ensure_built(self):
+        if self._postings is None and not self._load():
+            self._postings = {}
+            # An EntryTable reads its lazily loaded notes faster in one pass
+            rows = self.entries.iter_dicts() if hasattr(self.entries, "iter_dicts") else self.entries
+            for index, entry in enumerate(rows):
+                self._index(index, entry)
+        return self._postings
+
+    def add(self, index, entry):
+        if self._postings is None:
+            self.storage_version = None  # The saved index no longer matches; rebuild on first use
+            return
+        self._index(index, entry)
+
+    def update(self, index, old_entry, new_entry):
+        if self._postings is None:
+            self.storage_version = None
+            return
+        for token in entry_tokens(old_entry) - entry_tokens(new_entry):
+            postings = self._postings[token]
+            postings.discard(index)
+            if not postings:
+                del self._postings[token]
+                self._vocabulary = None
+        self._index(index, new_entry)
+
+    def search(self, query):
+        """Return indexes of entries containing every query term, by date.
+
+        A term ending in "*" matches any token starting with it.
+        """
+        self.ensure_built()
+        terms = QUERY_PATTERN.findall(query.lower())
+        if not terms:
+            return []
+        matches = None
+        # Intersect the rarest term first to keep the working set small
+        candidates = [self._term_postings(term, bool(star)) for term, star in terms]
+        for term_postings in sorted(candidates, key=len):
+            matches = set(term_postings) if matches is None else matches & term_postings
+            if not matches:
+                return []
+        # Entries are mostly appended in date order, so sorting by position
+        # first leaves the stable date sort an almost sorted run
+        ordered = sorted(matches)
+        if getattr(self.entries, "irregular", True):
+            ordered.sort(key=lambda index: self.entries[index]["date"])
+        else:
+            # An EntryTable's ordinal column sorts like the dates, without building each date string
+            ordered.sort(key=self.entries.ordinals.__getitem__)
+        return ordered
+
+    def save(self, storage_version):
+        """Persist the index, tagged with the storage version it reflects."""
+        if self.index_file is None or self._postings is None:
+            return
+        data = {
+            "version": INDEX_VERSION,
+            "storage_version": storage_version,
+            "count": len(self.entries),
+            "postings": {token: sorted(indexes) for token, indexes in self._postings.items()},
+        }
+        atomic_write(self.index_file, json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+    def _term_postings(self, term, prefix):
+        if not prefix:
+            return self._postings.get(term, set())
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        matches = set()
+        position = bisect_left(self._vocabulary, term)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(term):
+            matches |= self._postings[self._vocabulary[position]]
+            position += 1
+        return matches
+
+    def _index(self, index, entry):
+        for token in entry_tokens(entry):
+            postings = self._postings.get(token)
+            if postings is None:
+                self._postings[token] = {index}
+                self._vocabulary = None
+            else:
+                postings.add(index)
+
+    def _load(self):
+        if self.index_file is None or self.storage_version is None or not os.path.exists(self.index_file):
+            return False
+        try:
+            with open(self.index_file, "r") as file:
+                data = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            return False
+        if (data.get("version") != INDEX_VERSION or data.get("count") != len(self.entries)
+                or data.get("storage_version") != list(self.storage_version)):
+            return False
+        self._postings = {token: set(indexes) for token, indexes in data["postings"].items()}
+        return True
@@ -0,0 +1,485 @@
+import json
+import os
+import threading
+from array import array
+
+from mood_entries import EntryTable, SnapshotReader
+from persistence import (LINES_PER_WRITE, FileLock, SharedLog, atomic_write, atomic_write_chunks, encode_record,
+                         file_id, read_records, truncate_torn_tail, write_temp)
+
+# Number of journal records after which a background compaction is started
+COMPACT_THRESHOLD = 500
+
+SNAPSHOT_FORMAT = "mood-snapshot"
+JOURNAL_FORMAT = "mood-journal"
+
+
+def storage_paths(data_file):
+    """Return the (snapshot, journal) paths that live next to data_file."""
+    base, _ = os.path.splitext(data_file)
+    return base + ".snapshot.ndjson", base + ".journal.ndjson"
+
+
+def lock_path(data_file):
+    """Return the lock file every process writing this diary agrees on."""
+    return data_file + ".lock"
+
+
+def apply_record(entries, record):
+    """Apply one journal record to entries; return (index, old entry) or (None, None)."""
+    if record.get("op") == "add":
+        entries.append(record["entry"])
+        return len(entries) - 1, None
+    if record.get("op") == "set" and record["index"] < len(entries):
+        old_entry = dict(entries[record["index"]])  # A copy, since table rows are views
+        entries[record["index"]] = record["entry"]
+        return record["index"], old_entry
+    return None, None
+
+
+def notify_changes(on_change, old_entries, new_entries):
+    """Report how new_entries differs from old_entries to an on_change callback.
+
+    on_change(index, old_entry) gets old_entry None for an added entry,
+    and index None if entries were removed and everything must be redone.
+    """
+    if on_change is None:
+        return
+    if len(new_entries) < len(old_entries):
+        on_change(None, None)
+        return
+    for index, entry in enumerate(new_entries):
+        if index >= len(old_entries):
+            on_change(index, None)
+        elif entry != old_entries[index]:
+            on_change(index, old_entries[index])
+
+
+class JsonStorage:
+    """The original storage: one JSON list rewritten in full on every change.
+
+    Changes re-read the file under the diary's lock file first if another
+    process rewrote it, so concurrent writers do not lose each other's
+    entries; they do still serialize on the full rewrite.
+    """
+
+    def __init__(self, data_file, moods=()):
+        # moods only matters to JournalStorage; these entries stay plain dicts
+        self.data_file = data_file
+        self.entries = []
+        self.loaded = False
+        self.on_change = None  # Called for changes made by other processes, see notify_changes
+        self.lock = FileLock(lock_path(data_file))
+        self._seen = None  # Identity of the file version self.entries came from
+
+    def load(self):
+        with self.lock:
+            self.entries = self._read()
+        self.loaded = True
+        return self.entries
+
+    def iter_entries(self):
+        """Yield every entry in order (a JSON list has to be read whole)."""
+        yield from self.entries if self.loaded else self.load()
+
+    def refresh(self):
+        """Pick up changes other processes made to the file."""
+        with self.lock:
+            self._catch_up()
+
+    def add(self, entry):
+        """Append an entry and return its index."""
+        with self.lock:
+            self._catch_up()
+            self.entries.append(entry)
+            self._write()
+            return len(self.entries) - 1
+
+    def append_many(self, entries):
+        """Append a batch of entries and return their indexes."""
+        with self.lock:
+            self._catch_up()
+            first = len(self.entries)
+            self.entries.extend(entries)
+            self._write()
+            return list(range(first, len(self.entries)))
+
+    def update(self, index, entry):
+        with self.lock:
+            self._catch_up()
+            self.entries[index] = entry
+            self._write()
+
+    def update_many(self, updates):
+        """Apply (index, entry) pairs with a single rewrite."""
+        with self.lock:
+            self._catch_up()
+            for index, entry in updates:
+                self.entries[index] = entry
+            self._write()
+
+    def replace_all(self, entries):
+        with self.lock:
+            self.entries = entries
+            self._write()
+
+    def version(self):
+        """Return a value that changes whenever the stored data changes."""
+        if not os.path.exists(self.data_file):
+            return [0, 0]
+        stat = os.stat(self.data_file)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def compact(self, background=True):
+        pass  # The JSON file is always a full copy
+
+    def close(self):
+        pass
+
+    def _stamp(self):
+        return file_id(self.data_file), self.version()
+
+    def _read(self):
+        self._seen = self._stamp()
+        if not os.path.exists(self.data_file):
+            return []
+        with open(self.data_file, "r") as file:
+            return json.load(file)
+
+    def _catch_up(self):
+        if self._stamp() == self._seen:
+            return
+        old_entries = list(self.entries)
+        self.entries[:] = self._read()  # In place, so callers holding the list see the change
+        notify_changes(self.on_change, old_entries, self.entries)
+
+    def _write(self):
+        atomic_write(self.data_file, json.dumps(self.entries, indent=4).encode("utf-8"))
+        self._seen = self._stamp()
+
+
+class JournalStorage:
+    """Append-only journal on top of an atomically written snapshot.
+
+    Every add or edit appends one NDJSON record to the journal. Once the
+    journal grows past compact_threshold records, a background thread
+    folds it into a new snapshot. Snapshots carry a generation number and
+    the journal offset they cover, so a crash at any point of compaction
+    leaves a loadable diary.
+
+    Several processes can share a diary. Appends go through a SharedLog,
+    which holds the diary's lock file, applies records other processes
+    appended first (adds are positional, so order matters) and batches
+    concurrent appends into one write. Compaction writes the snapshot
+    before taking the lock and only renames it into place under the lock.
+
+    Loaded entries live in an EntryTable: dates and moods as compact
+    columns (moods coded in the order of the moods argument) and notes
+    read from the snapshot on demand. The snapshot is kept open for that,
+    so on Windows another process cannot compact the diary meanwhile.
+    """
+
+    def __init__(self, data_file, compact_threshold=COMPACT_THRESHOLD, moods=()):
+        self.data_file = data_file
+        self.snapshot_file, self.journal_file = storage_paths(data_file)
+        self.compact_threshold = compact_threshold
+        self.moods = tuple(moods)
+        self.entries = EntryTable(self.moods)
+        self.loaded = False
+        self.on_change = None  # Called for changes made by other processes, see notify_changes
+        self.generation = 0
+        self.journal_records = 0
+        self.log = SharedLog(self.journal_file, self._apply_logged, lock_path(data_file), reload=self._reload,
+                             identify=lambda path: self._read_journal_header())
+        self._compaction = None
+
+    @property
+    def journal_size(self):
+        return self.log.size
+
+    def load(self):
+        with self.log.locked():
+            self.migrate()
+            self.entries.close()
+            generation, self.entries, journal_header, replay_from, records = self._read_current()
+            self.generation = generation
+            if journal_header is None or journal_header["generation"] != generation:
+                tail = self._read_journal_bytes(replay_from) if replay_from is not None else b""
+                self._rotate_journal(generation, tail)
+            else:
+                truncate_torn_tail(self.journal_file)
+                self.log.seen()
+                self.journal_records = records
+        self.loaded = True
+        return self.entries
+
+    def iter_entries(self):
+        """Yield every entry in order, streaming the snapshot from disk.
+
+        Only the journal (kept short by compaction) is held in memory, so
+        an unloaded diary of any size can be exported in constant memory.
+        A legacy mood_diary.json is read as it is, without migrating it.
+        """
+        if self.loaded:
+            yield from self.entries.iter_dicts()
+            return
+        if not os.path.exists(self.snapshot_file):
+            if os.path.exists(self.data_file):
+                with self.log.locked():
+                    file = open(self.data_file, "r")  # Open under the lock, so a migration cannot interleave
+                with file:
+                    yield from json.load(file)
+            elif os.path.exists(self.journal_file):
+                yield from self.load().iter_dicts()
+            return
+        snapshot = read_records(self.snapshot_file)
+        changed, added = {}, []  # Snapshot position -> entry, and entries added since
+        with self.log.locked():
+            # Open the snapshot and read the journal together, so a compaction
+            # cannot slip in between; the open snapshot is then read unlocked
+            first = next(snapshot, None)
+            has_header = first is not None and first[1].get("format") == SNAPSHOT_FORMAT
+            if has_header:
+                count = first[1]["count"]
+                replay_from = self._replay_offset(first[1], self._read_journal_header())
+                for _, record in read_records(self.journal_file, replay_from) if replay_from is not None else ():
+                    if record.get("op") == "add":
+                        added.append(record["entry"])
+                    elif record.get("op") == "set" and record["index"] < count:
+                        changed[record["index"]] = record["entry"]
+                    elif record.get("op") == "set" and record["index"] - count < len(added):
+                        added[record["index"] - count] = record["entry"]
+        if first is not None and not has_header:
+            # No header, so the snapshot length is unknown without a full read
+            snapshot.close()
+            yield from self.load().iter_dicts()
+            return
+        for position, (_, entry) in enumerate(snapshot):
+            yield changed.get(position, entry)
+        yield from added
+
+    def refresh(self):
+        """Apply entries other processes added or changed since the last look."""
+        self.log.refresh()
+
+    def migrate(self):
+        """Convert a legacy mood_diary.json into a snapshot, once."""
+        if os.path.exists(self.snapshot_file) or not os.path.exists(self.data_file):
+            return
+        with open(self.data_file, "r") as file:
+            entries = json.load(file)
+        self._write_snapshot(entries, generation=1)
+        self._rotate_journal(1, b"")
+        os.replace(self.data_file, self.data_file + ".migrated")
+
+    def add(self, entry):
+        """Append an entry and return its index."""
+        (index, _), = self.log.append([{"op": "add", "entry": entry}])
+        self._maybe_compact()
+        return index
+
+    def append_many(self, entries):
+        """Append a batch of entries with one journal write and return their indexes.
+
+        Unlike add(), this never starts a compaction: bulk callers should
+        compact() themselves once journal_records reaches compact_threshold.
+        """
+        results = self.log.append([{"op": "add", "entry": entry} for entry in entries])
+        return [index for index, _ in results]
+
+    def update(self, index, entry):
+        self.log.append([{"op": "set", "index": index, "entry": entry}])
+        self._maybe_compact()
+
+    def update_many(self, updates):
+        """Apply (index, entry) pairs with one journal write."""
+        self.log.append([{"op": "set", "index": index, "entry": entry} for index, entry in updates])
+
+    def replace_all(self, entries):
+        self.wait_for_compaction()
+        if isinstance(entries, EntryTable):
+            entries = list(entries.iter_dicts())
+        table = EntryTable(self.moods)
+        for entry in entries:
+            table.append(entry)
+        with self.log.locked():
+            # Another process may have compacted to a later generation
+            journal_header = self._read_journal_header()
+            generation = max(self.generation, journal_header["generation"] if journal_header else 0) + 1
+            offsets = array("q")
+            tmp_path = write_temp(self.snapshot_file, self._snapshot_chunks(entries, generation, offsets))
+            self.entries.close()  # Windows cannot replace a file that is open
+            self.entries.assign(table)  # In place, so callers holding the table see the change
+            self.entries.replace_snapshot(tmp_path, self.snapshot_file, offsets)
+            self._rotate_journal(generation, b"")
+            self.generation = generation
+
+    def compact(self, background=True):
+        """Fold the journal into a fresh snapshot."""
+        with self.log.locked():
+            if self._compaction is not None and self._compaction.is_alive():
+                return
+            state = (self.entries.capture(), self.generation, self.log.size, self.log.identity)
+            self._compaction = threading.Thread(target=self._compact, args=state, name="mood-compaction")
+        if background:
+            self._compaction.start()
+        else:
+            self._compaction.run()
+
+    def version(self):
+        """Return a value that changes whenever the stored data changes."""
+        return [self.generation, self.journal_size]
+
+    def wait_for_compaction(self):
+        compaction = self._compaction
+        if compaction is not None and compaction.is_alive():
+            compaction.join()
+
+    def close(self):
+        self.wait_for_compaction()
+        self.entries.close()
+
+    def _compact(self, entries, generation, offset, journal):
+        # The slow part (writing every entry) runs without holding any lock
+        offsets = array("q")
+        tmp_path = write_temp(self.snapshot_file, self._snapshot_chunks(
+            entries, generation + 1, offsets, source_generation=generation, source_offset=offset))
+        with self.log.locked():
+            if self._read_journal_header() != journal or self.log.identity != journal:
+                os.remove(tmp_path)  # Another process compacted or replaced the diary first
+                self.entries.release_capture()
+                return
+            try:
+                # Also points the entries' notes at the new snapshot
+                self.entries.replace_snapshot(tmp_path, self.snapshot_file, offsets)
+            except PermissionError:
+                os.remove(tmp_path)  # Windows: another process has the snapshot open
+                self.entries.release_capture()
+                return
+            # Records appended since the capture move to the new journal; keep
+            # track of how many of them this process has already applied
+            applied = self.log.size - offset
+            self._rotate_journal(generation + 1, self._read_journal_bytes(offset), applied)
+            self.generation = generation + 1
+
+    def _maybe_compact(self):
+        if self.journal_records >= self.compact_threshold:
+            self.compact()
+
+    def _apply_logged(self, record, foreign):
+        index, old_entry = apply_record(self.entries, record)
+        self.journal_records += 1
+        if foreign and index is not None and self.on_change is not None:
+            self.on_change(index, old_entry)
+        return index, old_entry
+
+    def _reload(self):
+        # Another process rotated the journal; re-read everything in place
+        truncate_torn_tail(self.journal_file)
+        generation, entries, _, _, records = self._read_current()
+        changes = entries.changes_since(self.entries)
+        self.entries.assign(entries)  # In place, so callers holding the table see the change
+        self.generation = generation
+        self.journal_records = records
+        self.log.seen()
+        if self.on_change is not None:
+            for index, old_entry in changes if changes is not None else [(None, None)]:
+                self.on_change(index, old_entry)
+
+    def _read_current(self):
+        """Read the snapshot and replay the journal on top of it."""
+        header, entries = self._read_snapshot()
+        journal_header = self._read_journal_header()
+        replay_from = self._replay_offset(header, journal_header)
+        records = 0
+        if replay_from is not None:
+            for _, record in read_records(self.journal_file, replay_from):
+                apply_record(entries, record)
+                records += 1
+        return header["generation"], entries, journal_header, replay_from, records
+
+    def _read_snapshot(self):
+        header = {"generation": 0}
+        # Opened before reading, so the offsets below are into this very file
+        snapshot = SnapshotReader(self.snapshot_file) if os.path.exists(self.snapshot_file) else None
+        entries = EntryTable(self.moods, snapshot)
+        for offset, record in read_records(self.snapshot_file):
+            if offset == 0 and record.get("format") == SNAPSHOT_FORMAT:
+                header = record
+            else:
+                entries.append(record, offset)
+        return header, entries
+
+    def _snapshot_chunks(self, entries, generation, offsets=None, source_generation=None, source_offset=None):
+        """Yield the encoded snapshot, appending each entry's line offset to offsets."""
+        header = {"format": SNAPSHOT_FORMAT, "version": 1, "generation": generation,
+                  "source_generation": source_generation, "source_offset": source_offset,
+                  "count": len(entries)}
+        batch = [encode_record(header).encode("utf-8")]
+        position = len(batch[0])
+        for entry in entries.iter_dicts() if isinstance(entries, EntryTable) else entries:
+            line = encode_record(entry).encode("utf-8")
+            if offsets is not None:
+                offsets.append(position)
+            position += len(line)
+            batch.append(line)
+            if len(batch) >= LINES_PER_WRITE:
+                yield b"".join(batch)
+                batch = []
+        if batch:
+            yield b"".join(batch)
+
+    def _write_snapshot(self, entries, generation):
+        atomic_write_chunks(self.snapshot_file, self._snapshot_chunks(entries, generation))
+
+    @staticmethod
+    def _replay_offset(header, journal_header):
+        """Return the journal offset to replay from on top of the snapshot, or None."""
+        if journal_header is None:
+            return None
+        if journal_header["generation"] == header["generation"]:
+            return journal_header["offset"]
+        if journal_header["generation"] == header.get("source_generation"):
+            # Crashed after writing the snapshot but before rotating the journal
+            return header["source_offset"]
+        return None
+
+    def _read_journal_header(self):
+        for offset, record in read_records(self.journal_file):
+            if record.get("format") != JOURNAL_FORMAT:
+                return None
+            return {"generation": record["generation"], "token": record.get("token"),
+                    "offset": len(encode_record(record).encode("utf-8"))}
+        return None
+
+    def _read_journal_bytes(self, offset):
+        if not os.path.exists(self.journal_file):
+            return b""
+        with open(self.journal_file, "rb") as file:
+            file.seek(offset)
+            data = file.read()
+        # Drop a torn trailing record
+        return data[:data.rfind(b"\n") + 1]
+
+    def _rotate_journal(self, generation, tail, applied=None):
+        """Start a new journal holding tail, of which this process has applied the first applied bytes."""
+        # The random token tells this journal apart from any earlier one, even one of the same generation
+        header = {"format": JOURNAL_FORMAT, "generation": generation, "token": os.urandom(8).hex()}
+        header = encode_record(header).encode("utf-8")
+        atomic_write(self.journal_file, header + tail)
+        self.log.seen(len(header) + (len(tail) if applied is None else applied))
+        self.journal_records = tail.count(b"\n")
+
+
+# Storage backends selectable by name
+STORAGE_BACKENDS = {
+    "json": JsonStorage,
+    "journal": JournalStorage,
+}
+
+DEFAULT_BACKEND = "journal"
+
+
+def open_storage(data_file, backend=DEFAULT_BACKEND, moods=()):
+    """Create the storage backend registered under the given name."""
+    return STORAGE_BACKENDS[backend](data_file, moods=moods)
@@ -0,0 +1,270 @@
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_FILE_MODE = 0o644
+
+# Snapshot lines joined into one write() call (see JournalStorage._snapshot_chunks)
+LINES_PER_WRITE = 1000
+
+
+def atomic_write(path, data):
+    """Write bytes to path so readers only ever see the old or the new file."""
+    atomic_write_chunks(path, [data])
+
+
+def atomic_write_chunks(path, chunks):
+    """Atomically write an iterable of byte chunks, holding one chunk at a time."""
+    tmp_path = write_temp(path, chunks)
+    try:
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def write_temp(path, chunks):
+    """Write chunks to a synced temporary file next to path and return its name.
+
+    The caller moves it into place with os.replace (or removes it), which
+    lets the slow write happen before taking a lock and the rename after.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        # mkstemp creates the file as 0600; keep the permissions a plain open() would give
+        mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else DEFAULT_FILE_MODE
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, "wb") as file:
+            for chunk in chunks:
+                file.write(chunk)
+            file.flush()
+            os.fsync(file.fileno())
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+def encode_record(record):
+    """Serialize one record as a single NDJSON line."""
+    return json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
+
+
+def append_records(path, records):
+    """Append records to an NDJSON log with a single write and fsync; return the bytes written."""
+    data = "".join(encode_record(record) for record in records).encode("utf-8")
+    if not data:
+        return 0
+    with open(path, "ab") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    return len(data)
+
+
+def read_records(path, offset=0):
+    """Yield (offset, record) pairs from an NDJSON log starting at offset.
+
+    A torn last line (from a crash mid-append) is ignored rather than
+    raising, since it was never acknowledged to the caller.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as file:
+        file.seek(offset)
+        position = offset
+        for line in file:
+            start = position
+            position += len(line)
+            if not line.endswith(b"\n"):
+                return
+            try:
+                yield start, json.loads(line)
+            except json.JSONDecodeError:
+                return
+
+
+def complete_length(path):
+    """Return the size of path up to and including its last newline."""
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as file:
+        end = file.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - 65536)
+            file.seek(start)
+            block = file.read(end - start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                return start + newline + 1
+            end = start
+    return 0
+
+
+def truncate_torn_tail(path):
+    """Drop a partial last line left by a crash, so later appends stay readable."""
+    length = complete_length(path)
+    if os.path.exists(path) and os.path.getsize(path) != length:
+        with open(path, "r+b") as file:
+            file.truncate(length)
+
+
+def file_id(path):
+    """Return an identity for the file at path that changes when it is replaced."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+class FileLock:
+    """Advisory exclusive lock held on a companion lock file.
+
+    Every process that opens the same data uses the same lock file, so
+    read-modify-write cycles from different processes never interleave.
+    Uses flock on POSIX and msvcrt.locking on Windows.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def acquire(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, DEFAULT_FILE_MODE)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue  # LK_LOCK gives up after about 10 seconds; keep waiting
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    def release(self):
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class _PendingAppend:
+    __slots__ = ("records", "results", "error", "done")
+
+    def __init__(self, records):
+        self.records = records
+        self.results = None
+        self.error = None
+        self.done = False
+
+
+class SharedLog:
+    """NDJSON log that several processes and threads append to safely.
+
+    Every append holds the lock file. It first passes apply() the records
+    other processes added since this process last looked, then writes its
+    own records with one write and fsync and applies them too. Appends
+    from other threads that arrive while a write is in flight are grouped
+    into the next write (group commit), so one fsync covers them all.
+
+    If another process replaced the log (e.g. compacted it), reload() is
+    called instead of tailing; it must re-read the data and call seen().
+    Replacements are spotted by identify(path), which defaults to file_id;
+    logs that get replaced should identify themselves by content, since a
+    new file can reuse the inode number of the one it replaced.
+    """
+
+    def __init__(self, path, apply, lock_path, reload=None, identify=file_id):
+        self.path = path
+        self.apply = apply  # apply(record, foreign) -> result returned by append()
+        self.reload = reload
+        self.identify = identify
+        self.lock = FileLock(lock_path)
+        self.size = 0  # Bytes of the log already applied by this process
+        self.identity = None
+        self._commit_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending = []
+
+    @contextmanager
+    def locked(self):
+        """Hold both the in-process commit lock and the lock file."""
+        with self._commit_lock, self.lock:
+            yield
+
+    def seen(self, size=None):
+        """Record that the log has been applied up to size (default: all of it)."""
+        self.size = complete_length(self.path) if size is None else size
+        self.identity = self.identify(self.path)
+
+    def catch_up(self):
+        """Apply records other processes appended. Call with locked() held."""
+        identity = self.identify(self.path)
+        if identity != self.identity and self.identity is not None and self.reload is not None:
+            self.reload()
+            return
+        truncate_torn_tail(self.path)  # Only a crashed writer can leave one while we hold the lock
+        for _, record in read_records(self.path, self.size):
+            self.apply(record, True)
+        self.seen()
+
+    def refresh(self):
+        with self.locked():
+            self.catch_up()
+
+    def append(self, records):
+        """Durably append records and return apply()'s result for each of them."""
+        pending = _PendingAppend(records)
+        with self._pending_lock:
+            self._pending.append(pending)
+        with self._commit_lock:
+            if not pending.done:  # Otherwise an earlier committer wrote it for us
+                with self._pending_lock:
+                    batch, self._pending = self._pending, []
+                self._commit(batch)
+        if pending.error is not None:
+            raise pending.error
+        return pending.results
+
+    def _commit(self, batch):
+        try:
+            with self.lock:
+                self.catch_up()
+                written = append_records(self.path, [record for pending in batch for record in pending.records])
+                self.seen(self.size + written)
+                for pending in batch:
+                    pending.results = [self.apply(record, False) for record in pending.records]
+        except BaseException as error:
+            for pending in batch:
+                pending.error = error
+            raise
+        finally:
+            for pending in batch:
+                pending.done = True
@@ -0,0 +1,369 @@
+from array import array
+import math
+import os
+import random
+import struct
+import sys
+import time
+
+from persistence import atomic_write
+
+try:
+    import numpy as np
+except ImportError:  # Fall back to the array module; same API, slower ticks
+    np = None
+
+PET_TYPES = ["Rabbit", "Cat", "Dog", "Goat", "Bird"]
+
+MAX_STAT = 10
+START_STAT = 5
+
+# Stat points lost per second while time passes
+HUNGER_DECAY_PER_SECOND = 1 / 60
+HAPPINESS_DECAY_PER_SECOND = 1 / 90
+
+# Sprite bounding box (width, height) per pet type, in canvas pixels.
+# SpatialGrid cells should be at least as large as the biggest sprite.
+SPRITE_SIZES = {"Rabbit": (30, 20), "Cat": (30, 15), "Dog": (30, 20), "Goat": (20, 20), "Bird": (20, 20)}
+PET_SPEED = 50  # Pixels per second
+WANDER_PER_SECOND = 0.5  # Chance per second that a pet picks a new direction
+
+# A pet's mood is set by its lowest stat: below 2 it is miserable, below 5 grumpy...
+MOOD_NAMES = ["Miserable", "Grumpy", "Content", "Happy"]
+MOOD_THRESHOLDS = [2, 5, 8]
+
+
+def _float_array(size):
+    return np.zeros(size, dtype=np.float32) if np is not None else array("f", bytes(4 * size))
+
+
+def _byte_array(size):
+    return np.zeros(size, dtype=np.int8) if np is not None else array("b", bytes(size))
+
+
+# Save file layout: header, then one little-endian block per column
+SAVE_MAGIC = b"PETS"
+SAVE_VERSION = 1
+SAVE_HEADER = struct.Struct("<4sHId")  # magic, version, pet count, saved-at (Unix time)
+SAVE_COLUMNS = [("types", "b"), ("happiness", "f"), ("hunger", "f"), ("x", "f"), ("y", "f"), ("vx", "f"), ("vy", "f")]
+
+
+def _to_list(column, count):
+    return column[:count].tolist()
+
+
+def _like(column, values):
+    return np.asarray(values, dtype=column.dtype) if np is not None else array(column.typecode, values)
+
+
+SPRITE_WIDTHS = [SPRITE_SIZES[pet_type][0] for pet_type in PET_TYPES]
+SPRITE_HEIGHTS = [SPRITE_SIZES[pet_type][1] for pet_type in PET_TYPES]
+
+
+def mood_code(happiness, hunger):
+    lowest = min(happiness, hunger)
+    code = 0
+    for threshold in MOOD_THRESHOLDS:
+        if lowest >= threshold:
+            code += 1
+    return code
+
+
+class PetPopulation:
+    """Struct-of-arrays store for many pets, updated in batches.
+
+    Each stat is one contiguous float32 column indexed by pet number, so a
+    tick, feed or play over thousands of pets is a handful of vectorized
+    NumPy operations (or tight array loops when NumPy is not installed).
+    """
+
+    __slots__ = ("count", "names", "types", "happiness", "hunger", "moods", "x", "y", "vx", "vy", "rng")
+
+    def __init__(self, capacity=16):
+        self.count = 0
+        self.names = []
+        self.types = _byte_array(capacity)  # Index into PET_TYPES
+        self.happiness = _float_array(capacity)
+        self.hunger = _float_array(capacity)  # Fullness: 10 means not hungry at all
+        self.moods = _byte_array(capacity)  # Index into MOOD_NAMES
+        self.x = _float_array(capacity)  # Top-left corner of the sprite
+        self.y = _float_array(capacity)
+        self.vx = _float_array(capacity)  # Velocity in pixels per second
+        self.vy = _float_array(capacity)
+        self.rng = np.random.default_rng() if np is not None else random.Random()
+
+    def __len__(self):
+        return self.count
+
+    def add(self, name, pet_type, happiness=START_STAT, hunger=START_STAT, x=0.0, y=0.0):
+        """Add a pet and return its index."""
+        if self.count == len(self.happiness):
+            self._grow(2 * self.count)
+        index = self.count
+        self.count += 1
+        self.names.append(name)
+        self.types[index] = PET_TYPES.index(pet_type)
+        self.happiness[index] = happiness
+        self.hunger[index] = hunger
+        self.moods[index] = mood_code(happiness, hunger)
+        self.x[index] = x
+        self.y[index] = y
+        angle = random.uniform(0, 2 * math.pi)
+        self.vx[index] = PET_SPEED * math.cos(angle)
+        self.vy[index] = PET_SPEED * math.sin(angle)
+        return index
+
+    def pet_type(self, index):
+        return PET_TYPES[self.types[index]]
+
+    def mood(self, index):
+        return MOOD_NAMES[self.moods[index]]
+
+    def tick(self, seconds):
+        """Apply seconds of hunger and happiness decay to every pet."""
+        n = self.count
+        if np is not None:
+            for column, rate in ((self.happiness, HAPPINESS_DECAY_PER_SECOND), (self.hunger, HUNGER_DECAY_PER_SECOND)):
+                stats = column[:n]
+                np.subtract(stats, rate * seconds, out=stats)
+                np.maximum(stats, 0, out=stats)
+        else:
+            for column, rate in ((self.happiness, HAPPINESS_DECAY_PER_SECOND), (self.hunger, HUNGER_DECAY_PER_SECOND)):
+                loss = rate * seconds
+                column[:n] = array("f", [value - loss if value > loss else 0.0 for value in column[:n]])
+        self.update_moods()
+
+    def feed(self, indexes):
+        """Raise hunger by one for each pet that is not full; return which were fed."""
+        return self._bump(self.hunger, indexes)
+
+    def play(self, indexes):
+        """Raise happiness by one for each pet that is not at max; return which changed."""
+        return self._bump(self.happiness, indexes)
+
+    def update_moods(self, start=0):
+        n = self.count
+        if np is not None:
+            lowest = np.minimum(self.happiness[start:n], self.hunger[start:n])
+            self.moods[start:n] = np.digitize(lowest, MOOD_THRESHOLDS)
+        else:
+            for index in range(start, n):
+                self.moods[index] = mood_code(self.happiness[index], self.hunger[index])
+
+    def move(self, seconds, width, height):
+        """Advance every pet along its velocity, bouncing off the area's edges."""
+        n = self.count
+        if np is not None:
+            types = self.types[:n]
+            for position, velocity, sizes, limit in ((self.x, self.vx, SPRITE_WIDTHS, width),
+                                                     (self.y, self.vy, SPRITE_HEIGHTS, height)):
+                pos, vel = position[:n], velocity[:n]
+                pos += vel * seconds
+                # Reflect whatever crossed an edge back inside and flip its direction
+                low = pos < 0
+                pos[low] = -pos[low]
+                vel[low] = np.abs(vel[low])
+                room = limit - np.take(sizes, types)
+                high = pos > room
+                pos[high] = 2 * room[high] - pos[high]
+                vel[high] = -np.abs(vel[high])
+            wander = np.flatnonzero(self.rng.random(n) < WANDER_PER_SECOND * seconds)
+            angles = self.rng.uniform(0, 2 * math.pi, len(wander))
+            self.vx[wander] = PET_SPEED * np.cos(angles)
+            self.vy[wander] = PET_SPEED * np.sin(angles)
+            return
+        chance = WANDER_PER_SECOND * seconds
+        for index in range(n):
+            pet_type = self.types[index]
+            for position, velocity, room in ((self.x, self.vx, width - SPRITE_WIDTHS[pet_type]),
+                                             (self.y, self.vy, height - SPRITE_HEIGHTS[pet_type])):
+                pos = position[index] + velocity[index] * seconds
+                if pos < 0:
+                    pos, velocity[index] = -pos, abs(velocity[index])
+                elif pos > room:
+                    pos, velocity[index] = 2 * room - pos, -abs(velocity[index])
+                position[index] = pos
+            if self.rng.random() < chance:
+                angle = self.rng.uniform(0, 2 * math.pi)
+                self.vx[index] = PET_SPEED * math.cos(angle)
+                self.vy[index] = PET_SPEED * math.sin(angle)
+
+    def bounds(self, index):
+        """Return the sprite's (x1, y1, x2, y2) bounding box."""
+        pet_type = self.types[index]
+        x, y = float(self.x[index]), float(self.y[index])
+        return x, y, x + SPRITE_WIDTHS[pet_type], y + SPRITE_HEIGHTS[pet_type]
+
+    def resolve_collisions(self, grid):
+        """Swap velocities of overlapping pets that are moving towards each other."""
+        n = self.count
+        grid.rebuild(self.x, self.y, n)
+        # Plain lists are much faster than per-element NumPy indexing in this loop
+        xs, ys = _to_list(self.x, n), _to_list(self.y, n)
+        vxs, vys = _to_list(self.vx, n), _to_list(self.vy, n)
+        types = _to_list(self.types, n)
+        widths = [SPRITE_WIDTHS[pet_type] for pet_type in types]
+        heights = [SPRITE_HEIGHTS[pet_type] for pet_type in types]
+        collided = 0
+        for first, second in grid.candidate_pairs():
+            ax, bx = xs[first], xs[second]
+            if ax >= bx + widths[second] or bx >= ax + widths[first]:
+                continue
+            ay, by = ys[first], ys[second]
+            if ay >= by + heights[second] or by >= ay + heights[first]:
+                continue
+            # Only bounce if closing in, so overlapping pets can separate
+            closing = (vxs[second] - vxs[first]) * (bx - ax) + (vys[second] - vys[first]) * (by - ay)
+            if closing < 0:
+                vxs[first], vxs[second] = vxs[second], vxs[first]
+                vys[first], vys[second] = vys[second], vys[first]
+                collided += 1
+        if collided:
+            self.vx[:n] = _like(self.vx, vxs)
+            self.vy[:n] = _like(self.vy, vys)
+        return collided
+
+    def _bump(self, column, indexes):
+        # A pet listed more than once is still raised by one, on both backends
+        if np is not None:
+            indexes = np.asarray(indexes, dtype=np.intp)
+            values = column[indexes]
+            changed = values < MAX_STAT
+            # Repeated indexes all assign the same value, so they count once
+            column[indexes[changed]] = np.minimum(values[changed] + 1, MAX_STAT)
+            lowest = np.minimum(self.happiness[indexes], self.hunger[indexes])
+            self.moods[indexes] = np.digitize(lowest, MOOD_THRESHOLDS)
+            return changed
+        changed = []
+        bumped_pets = {}  # index -> whether it was raised, for repeated indexes
+        for index in indexes:
+            bumped = bumped_pets.get(index)
+            if bumped is None:
+                bumped = bumped_pets[index] = column[index] < MAX_STAT
+                if bumped:
+                    column[index] = min(column[index] + 1, MAX_STAT)
+                self.moods[index] = mood_code(self.happiness[index], self.hunger[index])
+            changed.append(bumped)
+        return changed
+
+    def _grow(self, capacity):
+        for name in ("types", "happiness", "hunger", "moods", "x", "y", "vx", "vy"):
+            old = getattr(self, name)
+            new = _byte_array(capacity) if name in ("types", "moods") else _float_array(capacity)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+
+class SpatialGrid:
+    """Uniform grid of square cells used to find pets near each other.
+
+    Rebuilding buckets every pet by cell in O(n); neighbor queries then
+    only look at the 3x3 block of cells around a point instead of at
+    every pet.
+    """
+
+    def __init__(self, cell_size=32):
+        self.cell_size = cell_size
+        self.cells = {}  # (column, row) -> list of pet indexes
+
+    def rebuild(self, xs, ys, count):
+        self.cells = {}
+        if np is not None:
+            columns = (np.asarray(xs[:count]) // self.cell_size).astype(np.int64).tolist()
+            rows = (np.asarray(ys[:count]) // self.cell_size).astype(np.int64).tolist()
+        else:
+            columns = [int(x // self.cell_size) for x in xs[:count]]
+            rows = [int(y // self.cell_size) for y in ys[:count]]
+        for index, cell in enumerate(zip(columns, rows)):
+            bucket = self.cells.get(cell)
+            if bucket is None:
+                self.cells[cell] = [index]
+            else:
+                bucket.append(index)
+
+    def nearby(self, x, y):
+        """Yield indexes of pets in the cell containing (x, y) and its neighbors."""
+        column, row = int(x // self.cell_size), int(y // self.cell_size)
+        for dc in (-1, 0, 1):
+            for dr in (-1, 0, 1):
+                yield from self.cells.get((column + dc, row + dr), ())
+
+    def candidate_pairs(self):
+        """Yield each pair of pets in the same or adjacent cells exactly once."""
+        for (column, row), bucket in self.cells.items():
+            for i, first in enumerate(bucket):
+                for second in bucket[i + 1:]:
+                    yield first, second
+            # Half of the neighborhood, so each pair of cells is visited once
+            for dc, dr in ((1, -1), (1, 0), (1, 1), (0, 1)):
+                other = self.cells.get((column + dc, row + dr))
+                if other:
+                    for first in bucket:
+                        for second in other:
+                            yield first, second
+
+
+def _column_bytes(column, typecode, count):
+    if np is not None:
+        return np.ascontiguousarray(column[:count], dtype="<" + typecode).tobytes()
+    values = array(typecode, column[:count])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _column_from_bytes(data, typecode, capacity):
+    if np is not None:
+        column = np.zeros(capacity, dtype=typecode)
+        column[:len(data) // np.dtype(typecode).itemsize] = np.frombuffer(data, dtype="<" + typecode)
+        return column
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    values.extend([0] * (capacity - len(values)))
+    return values
+
+
+def save_population(population, path, saved_at=None):
+    """Write every pet to path in a compact column-per-stat binary format."""
+    count = population.count
+    parts = [SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION, count, time.time() if saved_at is None else saved_at)]
+    for name, typecode in SAVE_COLUMNS:
+        parts.append(_column_bytes(getattr(population, name), typecode, count))
+    # Names come from a single-line entry, so NUL is a safe separator
+    parts.append("\0".join(population.names[:count]).encode("utf-8"))
+    atomic_write(path, b"".join(parts))
+
+
+def load_population(path, now=None):
+    """Load pets saved by save_population and apply the time they were away.
+
+    Decay is linear with a floor at zero, so a single tick() over the whole
+    absence gives exactly the same stats as replaying every missed tick.
+    Returns (population, seconds away), or (None, 0) if there is no save.
+    """
+    if not os.path.exists(path):
+        return None, 0.0
+    with open(path, "rb") as file:
+        data = file.read()
+    if len(data) < SAVE_HEADER.size:
+        raise ValueError(f"{path} is empty or truncated")
+    magic, version, count, saved_at = SAVE_HEADER.unpack_from(data)
+    if magic != SAVE_MAGIC or version != SAVE_VERSION:
+        raise ValueError(f"{path} is not a version {SAVE_VERSION} pet save file")
+    if len(data) < SAVE_HEADER.size + sum(struct.calcsize(typecode) for _, typecode in SAVE_COLUMNS) * count:
+        raise ValueError(f"{path} is truncated")
+    population = PetPopulation(capacity=max(count, 16))
+    offset = SAVE_HEADER.size
+    for name, typecode in SAVE_COLUMNS:
+        size = struct.calcsize(typecode) * count
+        setattr(population, name, _column_from_bytes(data[offset:offset + size], typecode, max(count, 16)))
+        offset += size
+    population.names = data[offset:].decode("utf-8").split("\0") if count else []
+    if len(population.names) != count:
+        raise ValueError(f"{path} is truncated")
+    population.count = count
+    away = max(0.0, (time.time() if now is None else now) - saved_at)
+    population.tick(away)
+    return population, away
@@ -0,0 +1,178 @@
+import heapq
+import itertools
+import math
+import time
+
+SESSION = "session"
+SHORT_BREAK = "short_break"
+LONG_BREAK = "long_break"
+
+# Events returned by PomodoroEngine.poll()
+SESSION_COMPLETE = "session_complete"
+BREAK_COMPLETE = "break_complete"
+
+
+class PomodoroEngine:
+    """Headless Pomodoro state machine driven by a monotonic clock.
+
+    Remaining time is always derived from an absolute deadline, so late or
+    irregular polling never stretches a session. Each phase's deadline is
+    chained from the previous deadline rather than from when the poll
+    happened to run, unless a whole phase went by without a poll.
+    Pass a fake clock to drive it at full speed.
+    """
+
+    def __init__(self, session_duration, short_break_duration, long_break_duration,
+                 sessions_per_long_break=4, clock=time.monotonic):
+        self.durations = {
+            SESSION: session_duration,
+            SHORT_BREAK: short_break_duration,
+            LONG_BREAK: long_break_duration,
+        }
+        self.sessions_per_long_break = sessions_per_long_break
+        self.clock = clock
+        self.phase = SESSION
+        self.is_running = False
+        self.is_paused = False
+        self.session_count = 0
+        self.deadline = None
+        self.paused_remaining = None
+
+    def start(self):
+        if self.is_running:
+            return
+        self.is_running = True
+        self.is_paused = False
+        self.phase = SESSION
+        self.deadline = self.clock() + self.durations[SESSION]
+
+    def stop(self):
+        self.is_running = False
+        self.is_paused = False
+        self.phase = SESSION
+        self.deadline = None
+
+    def pause(self):
+        if self.is_running and not self.is_paused:
+            self.paused_remaining = max(0.0, self.deadline - self.clock())
+            self.is_paused = True
+
+    def resume(self):
+        if self.is_running and self.is_paused:
+            # Keep the sub-second remainder so the display does not jump a second
+            self.deadline = self.clock() + self.paused_remaining
+            self.is_paused = False
+
+    def remaining(self):
+        """Return the exact seconds left in the current phase."""
+        if not self.is_running:
+            return float(self.durations[self.phase])
+        if self.is_paused:
+            return self.paused_remaining
+        return max(0.0, self.deadline - self.clock())
+
+    def display_seconds(self):
+        """Return the whole seconds to show, counting down to 0 at the deadline."""
+        return math.ceil(self.remaining())
+
+    def poll(self):
+        """Finish the current phase if its deadline has passed and return the events.
+
+        Each event is (event, duration, end), where end is the phase's
+        deadline on the engine's clock.
+        """
+        events = []
+        if not self.is_running or self.is_paused:
+            return events
+        now = self.clock()
+        if now < self.deadline:
+            return events
+        end = self.deadline
+        if self.phase == SESSION:
+            self.session_count += 1
+            events.append((SESSION_COMPLETE, self.durations[SESSION], end))
+            long_break = self.session_count % self.sessions_per_long_break == 0
+            self.phase = LONG_BREAK if long_break else SHORT_BREAK
+        else:
+            events.append((BREAK_COMPLETE, self.durations[self.phase], end))
+            self.phase = SESSION
+        self.deadline = end + self.durations[self.phase]
+        if now >= self.deadline:
+            # The next phase went by unattended too (e.g. the machine slept):
+            # credit only the phase that was running and restart from now
+            self.deadline = now + self.durations[self.phase]
+        return events
+
+    def next_wakeup(self):
+        """Return seconds until the displayed second or the phase changes."""
+        if not self.is_running or self.is_paused:
+            return None
+        remaining = self.remaining()
+        return max(0.0, remaining - (math.ceil(remaining) - 1))
+
+
+class TimerScheduler:
+    """Min-heap of wakeup times for many named PomodoroEngines.
+
+    Each running timer has one live heap entry for its next wakeup (the
+    next time its displayed second or phase changes). The owner sleeps
+    until next_due() and then calls run_due(), so any number of timers
+    needs a single pending wakeup. Rescheduling a timer leaves its old
+    entry in the heap; stale entries are skipped when they surface.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.timers = {}  # name -> PomodoroEngine
+        self._heap = []  # (due, token, name)
+        self._tokens = {}  # name -> token of its live heap entry
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self.timers)
+
+    def add(self, name, engine):
+        self.timers[name] = engine
+        self.reschedule(name)
+
+    def remove(self, name):
+        del self.timers[name]
+        self._tokens.pop(name, None)
+
+    def reschedule(self, name):
+        """Recompute a timer's wakeup after it was started, paused, resumed or stopped."""
+        wakeup = self.timers[name].next_wakeup()
+        if wakeup is None:
+            self._tokens.pop(name, None)
+            return
+        token = next(self._counter)
+        self._tokens[name] = token
+        heapq.heappush(self._heap, (self.clock() + wakeup, token, name))
+        if len(self._heap) > 2 * len(self._tokens) + 16:
+            # Mostly stale entries (e.g. after many pauses); drop them
+            self._heap = [entry for entry in self._heap if self._tokens.get(entry[2]) == entry[1]]
+            heapq.heapify(self._heap)
+
+    def next_due(self):
+        """Return the clock time of the earliest wakeup, or None if no timer is running."""
+        heap = self._heap
+        while heap and self._tokens.get(heap[0][2]) != heap[0][1]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def run_due(self):
+        """Poll every timer whose wakeup has passed; return {name: events}."""
+        now = self.clock()
+        due = []
+        while True:
+            next_due = self.next_due()
+            if next_due is None or next_due > now:
+                break
+            _, _, name = heapq.heappop(self._heap)
+            del self._tokens[name]
+            due.append(name)
+        results = {}
+        for name in due:
+            results[name] = self.timers[name].poll()
+            self.reschedule(name)
+        return results
@@ -0,0 +1,150 @@
+"""Measure import cost and cold-start-to-first-frame time of the three apps.
+
+Each measurement runs in a fresh interpreter inside a scratch directory, so
+nothing is cached between runs and no real diary or study data is touched.
+
+    python startup_bench.py                      # print a report
+    python startup_bench.py --json startup.json  # also save the results
+    python startup_bench.py --compare startup.json --tolerance 0.25
+
+With --compare the script exits with status 1 if any median got slower
+than the saved baseline by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+APPS = {
+    "Pomodoro": "PomodoroApp",
+    "Mood_Diary": "MoodDiaryApp",
+    "Virtual_Pet": "PetApp",
+}
+
+FIRST_FRAME_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {repo!r})
+import tkinter as tk
+import {module} as app_module
+imported = time.perf_counter()
+root = tk.Tk()
+app = app_module.{app_class}(root)
+root.update_idletasks()
+root.update()
+print("FIRST_FRAME", imported - start, time.perf_counter() - start, flush=True)
+root.destroy()
+"""
+
+
+def run_python(args, cwd):
+    return subprocess.run([sys.executable] + args, cwd=cwd, capture_output=True, text=True)
+
+
+def import_cost(module, cwd):
+    """Return (cumulative import microseconds, heaviest nested imports) for module."""
+    result = run_python(["-X", "importtime", "-c", f"import sys; sys.path.insert(0, {REPO_DIR!r}); import {module}"], cwd)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2  # Nesting is shown as two spaces per level
+        rows.append((int(cumulative_us), depth, name.strip()))
+    total = next(cumulative for cumulative, depth, name in rows if depth == 0 and name == module)
+    # Direct imports of the app module, heaviest first
+    heaviest = sorted(row for row in rows if row[1] == 1)[::-1][:5]
+    return total, [(name, cumulative) for cumulative, _, name in heaviest]
+
+
+def first_frame(module, app_class, cwd):
+    """Return (process start to first frame, in-process import, in-process first frame) seconds."""
+    script = FIRST_FRAME_SCRIPT.format(repo=REPO_DIR, module=module, app_class=app_class)
+    launched = time.perf_counter()
+    result = run_python(["-c", script], cwd)
+    wall = time.perf_counter() - launched
+    for line in result.stdout.splitlines():
+        if line.startswith("FIRST_FRAME"):
+            _, imported, frame = line.split()
+            return wall, float(imported), float(frame)
+    raise RuntimeError((result.stderr.strip().splitlines() or ["no output"])[-1])
+
+
+def measure(runs):
+    results = {}
+    for module, app_class in APPS.items():
+        entry = {}
+        with tempfile.TemporaryDirectory() as cwd:
+            try:
+                samples = [import_cost(module, cwd) for _ in range(runs)]
+                entry["import_ms"] = statistics.median(total for total, _ in samples) / 1000
+                entry["heaviest_imports_ms"] = {name: us / 1000 for name, us in samples[-1][1]}
+            except RuntimeError as error:
+                entry["import_error"] = str(error)
+            try:
+                samples = [first_frame(module, app_class, cwd) for _ in range(runs)]
+                entry["cold_start_ms"] = statistics.median(wall for wall, _, _ in samples) * 1000
+                entry["first_frame_ms"] = statistics.median(frame for _, _, frame in samples) * 1000
+            except RuntimeError as error:
+                # Typically "no display name" on a headless machine
+                entry["first_frame_error"] = str(error)
+        results[module] = entry
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human readable regressions against baseline."""
+    regressions = []
+    for module, entry in results.items():
+        for metric in ("import_ms", "cold_start_ms", "first_frame_ms"):
+            old = baseline.get(module, {}).get(metric)
+            new = entry.get(metric)
+            if old and new and new > old * (1 + tolerance):
+                regressions.append(f"{module} {metric}: {old:.1f} ms -> {new:.1f} ms")
+    return regressions
+
+
+def print_report(results):
+    for module, entry in results.items():
+        print(module)
+        for metric in ("import_ms", "cold_start_ms", "first_frame_ms"):
+            if metric in entry:
+                print(f"  {metric:<15} {entry[metric]:8.1f}")
+        for name, ms in entry.get("heaviest_imports_ms", {}).items():
+            print(f"    {name:<30} {ms:8.1f} ms")
+        for key in ("import_error", "first_frame_error"):
+            if key in entry:
+                print(f"  {key}: {entry[key]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement (median is reported)")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --json run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, as a fraction")
+    args = parser.parse_args()
+
+    results = measure(args.runs)
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=4)
+    if args.compare:
+        with open(args.compare, "r") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
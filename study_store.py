@@ -0,0 +1,198 @@
+import json
+import os
+from datetime import date, datetime, timedelta
+
+from persistence import SharedLog, append_records, atomic_write, read_records, truncate_torn_tail
+
+ROLLUP_VERSION = 1
+
+# Rewrite the rollup checkpoint after this many new sessions (and on close)
+CHECKPOINT_EVERY = 20
+
+# Chart granularities, finest first, and the most points a chart should draw
+GRANULARITIES = ("day", "week", "month", "year")
+MAX_CHART_POINTS = 400
+
+
+def store_paths(data_file):
+    """Return the (sessions log, rollup checkpoint) paths next to data_file."""
+    base, _ = os.path.splitext(data_file)
+    return base + ".sessions.ndjson", base + ".rollups.json"
+
+
+def week_key(day):
+    iso_year, iso_week, _ = day.isocalendar()
+    return f"{iso_year:04d}-W{iso_week:02d}"
+
+
+def bucket_start(day, granularity):
+    """Return the first day of the day/week/month/year bucket holding day."""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def aggregate_hours(daily, granularity):
+    """Sum a {"YYYY-MM-DD": hours} mapping into sorted (bucket start, hours) lists."""
+    totals = {}
+    for key, hours in daily.items():
+        bucket = bucket_start(date.fromisoformat(key), granularity)
+        totals[bucket] = totals.get(bucket, 0) + hours
+    buckets = sorted(totals)
+    return buckets, [totals[bucket] for bucket in buckets]
+
+
+def choose_granularity(daily, max_points=MAX_CHART_POINTS):
+    """Pick the finest granularity whose bucket count fits in max_points."""
+    if not daily:
+        return GRANULARITIES[0]
+    first, last = date.fromisoformat(min(daily)), date.fromisoformat(max(daily))
+    span_days = (last - first).days + 1
+    for granularity, days_per_bucket in zip(GRANULARITIES, (1, 7, 30.4, 365.25)):
+        if span_days / days_per_bucket <= max_points:
+            return granularity
+    return GRANULARITIES[-1]
+
+
+def chart_series(daily, granularity="auto", max_points=MAX_CHART_POINTS):
+    """Return (granularity, bucket dates, hours) ready for plotting."""
+    if granularity == "auto":
+        granularity = choose_granularity(daily, max_points)
+    buckets, hours = aggregate_hours(daily, granularity)
+    return granularity, buckets, hours
+
+
+def _set_aside(path):
+    """Move an unreadable file out of the way instead of overwriting it."""
+    corrupt_path = f"{path}.corrupt-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    os.replace(path, corrupt_path)
+    print(f"Could not read {path}; moved it to {corrupt_path}")
+
+
+class StudyStore:
+    """Append-only log of study sessions with incrementally kept rollups.
+
+    Each finished session is one record in the sessions log, written with
+    a single append. Daily and weekly hour totals are updated in memory
+    as sessions are logged. They are checkpointed with the log offset they
+    cover, so loading only replays sessions logged after the checkpoint.
+
+    Several Pomodoro windows (or scripts) can log to the same store: the
+    log is a SharedLog, so every append holds a lock file and first folds
+    in sessions the other processes logged.
+    """
+
+    def __init__(self, data_file):
+        self.data_file = data_file
+        self.sessions_file, self.rollup_file = store_paths(data_file)
+        self.daily = {}  # "YYYY-MM-DD" -> hours
+        self.weekly = {}  # "YYYY-Www" -> hours
+        self.version = 0  # Bumped on every change, for caches built on the rollups
+        self.log = SharedLog(self.sessions_file, self._apply_logged, data_file + ".lock")
+        self._unsaved = 0
+
+    @property
+    def log_offset(self):
+        """Bytes of the sessions log folded into the rollups."""
+        return self.log.size
+
+    def load(self):
+        with self.log.locked():
+            self.migrate()
+            truncate_torn_tail(self.sessions_file)
+            offset = self._read_checkpoint()
+            replayed = 0
+            for _, record in read_records(self.sessions_file, offset):
+                self._add_to_rollups(record)
+                replayed += 1
+            self.log.seen()
+        self.version += 1
+        if replayed:
+            self.checkpoint()
+        return self
+
+    def refresh(self):
+        """Fold in sessions other processes logged since the last look."""
+        self.log.refresh()
+
+    def migrate(self):
+        """Turn a legacy study_data.json ({date: hours}) into session records, once."""
+        if not os.path.exists(self.data_file) or os.path.exists(self.sessions_file):
+            return
+        try:
+            with open(self.data_file, "r") as file:
+                study_data = json.load(file)
+        except json.JSONDecodeError:
+            _set_aside(self.data_file)
+            return
+        records = [{"name": "default", "start": day, "end": day, "hours": hours, "legacy": True}
+                   for day, hours in sorted(study_data.items())]
+        append_records(self.sessions_file, records)  # Called from load(), with the lock held
+        os.replace(self.data_file, self.data_file + ".migrated")
+
+    def log_session(self, start, end, name="default"):
+        """Append one finished session and fold it into the rollups."""
+        record = {
+            "name": name,
+            "start": start.isoformat(timespec="seconds"),
+            "end": end.isoformat(timespec="seconds"),
+            "hours": (end - start).total_seconds() / 3600,
+        }
+        self.log.append([record])
+        if self._unsaved >= CHECKPOINT_EVERY:
+            self.checkpoint()
+        return record
+
+    def log_hours(self, hours, name="default", end=None):
+        """Log a session of the given length that ended at end (default: just now)."""
+        end = end or datetime.now()
+        return self.log_session(end - timedelta(hours=hours), end, name)
+
+    def sessions(self):
+        """Yield every logged session record, oldest first."""
+        for _, record in read_records(self.sessions_file):
+            yield record
+
+    def checkpoint(self):
+        data = {"version": ROLLUP_VERSION, "log_offset": self.log_offset,
+                "daily": self.daily, "weekly": self.weekly}
+        atomic_write(self.rollup_file, json.dumps(data, separators=(",", ":")).encode("utf-8"))
+        self._unsaved = 0
+
+    def close(self):
+        if self._unsaved:
+            self.checkpoint()
+
+    def _read_checkpoint(self):
+        """Load the rollups and return the log offset they cover."""
+        self.daily, self.weekly = {}, {}
+        if not os.path.exists(self.rollup_file):
+            return 0
+        try:
+            with open(self.rollup_file, "r") as file:
+                data = json.load(file)
+        except json.JSONDecodeError:
+            # The log is the source of truth, so the rollups can be rebuilt
+            _set_aside(self.rollup_file)
+            return 0
+        if data.get("version") != ROLLUP_VERSION:
+            return 0
+        self.daily, self.weekly = data["daily"], data["weekly"]
+        return data["log_offset"]
+
+    def _apply_logged(self, record, foreign):
+        self._add_to_rollups(record)
+        self.version += 1
+        self._unsaved += 1
+        return record
+
+    def _add_to_rollups(self, record):
+        day = date.fromisoformat(record["end"][:10])
+        key = day.isoformat()
+        self.daily[key] = self.daily.get(key, 0) + record["hours"]
+        key = week_key(day)
+        self.weekly[key] = self.weekly.get(key, 0) + record["hours"]
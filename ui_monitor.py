@@ -0,0 +1,209 @@
+"""Opt-in event-loop latency monitor and profiling hooks for the Tk apps.
+
+Set TK_UI_MONITOR=1 before starting an app to record how long every
+callback runs (button commands, bindings, scroll commands) and how late
+every root.after() callback fires. Press F12 in the app to toggle a debug
+overlay. When the app exits the numbers are written as JSON to
+TK_UI_MONITOR_FILE (default ui_monitor.json).
+
+    TK_UI_MONITOR=1 python Pomodoro.py
+"""
+import atexit
+import json
+import os
+import time
+import tkinter as tk
+
+ENV_VAR = "TK_UI_MONITOR"
+FILE_ENV_VAR = "TK_UI_MONITOR_FILE"
+DEFAULT_DUMP_FILE = "ui_monitor.json"
+
+# Histogram bucket upper bounds in milliseconds; the last bucket is open ended
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+# An after() callback that fires later than this has missed its deadline
+MISSED_DEADLINE_MS = 50
+
+OVERLAY_REFRESH_MS = 500
+
+# Name given to after() wrappers so the _register hook does not time them twice
+_AFTER_WRAPPER_NAME = "_ui_monitor_after_callback"
+
+
+def callback_name(func):
+    owner = getattr(func, "__self__", None)
+    name = getattr(func, "__qualname__", None) or getattr(func, "__name__", repr(func))
+    if owner is not None and "." not in name:
+        name = f"{type(owner).__name__}.{name}"
+    return name
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        self.calls += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        for bucket, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.counts[bucket] += 1
+                return
+        self.counts[-1] += 1
+
+    def percentile(self, fraction):
+        """Return the upper bound of the bucket holding the given percentile."""
+        target = fraction * self.calls
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return BUCKETS_MS[bucket] if bucket < len(BUCKETS_MS) else self.max_ms
+        return 0.0
+
+    def to_dict(self):
+        labels = [f"<={bound}ms" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {
+            "calls": self.calls,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "histogram": dict(zip(labels, self.counts)),
+        }
+
+
+class UIMonitor:
+    """Times Tk callbacks by hooking tkinter's Misc.after and Misc._register."""
+
+    def __init__(self, root):
+        self.root = root
+        self.handlers = {}  # callback name -> Histogram of run time
+        self.latency = {}  # after() callback name -> Histogram of lateness
+        self.missed = {}  # after() callback name -> calls later than MISSED_DEADLINE_MS
+        self.started = time.perf_counter()
+        self.overlay = None
+        self._original_after = None
+        self._original_register = None
+
+    def install(self):
+        monitor = self
+        original_after = self._original_after = tk.Misc.after
+        original_register = self._original_register = tk.Misc._register
+
+        def after(widget, ms, func=None, *args):
+            if func is None:
+                return original_after(widget, ms)  # Plain sleep, nothing to time
+            name = callback_name(func)
+            delay_ms = ms if isinstance(ms, (int, float)) else 0  # after_idle passes "idle"
+            due = time.perf_counter() + delay_ms / 1000
+
+            def timed(*call_args):
+                start = time.perf_counter()
+                monitor.record_latency(name, (start - due) * 1000)
+                try:
+                    return func(*call_args)
+                finally:
+                    monitor.record_handler(name, (time.perf_counter() - start) * 1000)
+
+            timed.__name__ = _AFTER_WRAPPER_NAME
+            return original_after(widget, ms, timed, *args)
+
+        def register(widget, func, subst=None, needcleanup=1):
+            if getattr(func, "__name__", None) != _AFTER_WRAPPER_NAME:
+                name = callback_name(func)
+
+                def timed(*call_args):
+                    start = time.perf_counter()
+                    try:
+                        return func(*call_args)
+                    finally:
+                        monitor.record_handler(name, (time.perf_counter() - start) * 1000)
+
+                return original_register(widget, timed, subst, needcleanup)
+            return original_register(widget, func, subst, needcleanup)
+
+        tk.Misc.after = after
+        tk.Misc._register = register
+        self.root.bind_all("<F12>", lambda event: self.toggle_overlay())
+        return self
+
+    def uninstall(self):
+        if self._original_after is not None:
+            tk.Misc.after = self._original_after
+            tk.Misc._register = self._original_register
+            self._original_after = self._original_register = None
+
+    def record_handler(self, name, ms):
+        histogram = self.handlers.get(name)
+        if histogram is None:
+            histogram = self.handlers[name] = Histogram()
+        histogram.add(ms)
+
+    def record_latency(self, name, ms):
+        ms = max(0.0, ms)
+        histogram = self.latency.get(name)
+        if histogram is None:
+            histogram = self.latency[name] = Histogram()
+            self.missed[name] = 0
+        histogram.add(ms)
+        if ms > MISSED_DEADLINE_MS:
+            self.missed[name] += 1
+
+    def report(self):
+        return {
+            "uptime_s": round(time.perf_counter() - self.started, 3),
+            "missed_deadline_ms": MISSED_DEADLINE_MS,
+            "handlers": {name: histogram.to_dict() for name, histogram in self.handlers.items()},
+            "after_latency": {name: dict(histogram.to_dict(), missed_deadlines=self.missed[name])
+                              for name, histogram in self.latency.items()},
+        }
+
+    def dump(self, path):
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=4)
+
+    def summary_lines(self, limit=8):
+        lines = ["Slowest handlers (max / mean ms, calls)"]
+        slowest = sorted(self.handlers.items(), key=lambda item: item[1].max_ms, reverse=True)[:limit]
+        for name, histogram in slowest:
+            lines.append(f"  {name[:34]:<34} {histogram.max_ms:7.1f} {histogram.total_ms / histogram.calls:6.1f} {histogram.calls:6d}")
+        lines.append("after() lateness (p50 / p95 / max ms, missed)")
+        for name, histogram in sorted(self.latency.items()):
+            lines.append(f"  {name[:34]:<34} {histogram.percentile(0.5):5.0f} {histogram.percentile(0.95):5.0f} "
+                         f"{histogram.max_ms:7.1f} {self.missed[name]:5d}")
+        return lines
+
+    def toggle_overlay(self):
+        if self.overlay is not None:
+            self.overlay.destroy()
+            self.overlay = None
+            return
+        self.overlay = tk.Toplevel(self.root)
+        self.overlay.title("UI Monitor")
+        self.overlay.attributes("-topmost", True)
+        label = tk.Label(self.overlay, font=("Courier", 10), justify=tk.LEFT, anchor="w")
+        label.pack(padx=8, pady=8)
+
+        def refresh():
+            if self.overlay is None:
+                return
+            label.config(text="\n".join(self.summary_lines()))
+            # Schedule through the original after() so the overlay does not measure itself
+            self._original_after(self.overlay, OVERLAY_REFRESH_MS, refresh)
+
+        refresh.__name__ = _AFTER_WRAPPER_NAME
+        refresh()
+
+
+def enable_from_env(root):
+    """Install a UIMonitor on root if TK_UI_MONITOR is set; return it or None."""
+    if not os.environ.get(ENV_VAR):
+        return None
+    monitor = UIMonitor(root).install()
+    dump_file = os.environ.get(FILE_ENV_VAR, DEFAULT_DUMP_FILE)
+    atexit.register(monitor.dump, dump_file)
+    return monitor